@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Benchmark the reference and vectorized IPD error detectors against each other
+"""
+
+import argparse
+import time
+
+import polars as pl
+
+from detect_errors import (DATA_PATH, detect_player_errors, detect_player_errors_vectorized, scan_player_errors,
+                           stream_player_errors)
+
+
+def time_detector(detector, df, start_date, end_date, repeat):
+    """Returns the result of the detector and its best wall time over `repeat` runs."""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = detector(df, start_date, end_date)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('path', nargs='?', default=DATA_PATH, help='parquet or CSV file with IPD games')
+    parser.add_argument('--start-date', default=None, help="optional 'YYYY-MM-DD' lower bound")
+    parser.add_argument('--end-date', default=None, help="optional 'YYYY-MM-DD' upper bound")
+    parser.add_argument('--repeat', type=int, default=3, help='runs per detector, best time is reported')
+    args = parser.parse_args()
+
+    print(f"Loading {args.path}...")
+    df = pl.read_parquet(args.path) if args.path.endswith('.parquet') else pl.read_csv(args.path)
+    print(f"Rows: {len(df):,}")
+
+    reference, reference_time = time_detector(detect_player_errors, df, args.start_date, args.end_date, args.repeat)
+    timings = {'reference': reference_time}
+    results = {}
+    results['vectorized'], timings['vectorized'] = time_detector(
+        detect_player_errors_vectorized, df, args.start_date, args.end_date, args.repeat)
+    # The lazy scan reads the file itself, so its time includes the parquet read
+    results['scan'], timings['scan'] = time_detector(
+        scan_player_errors, args.path, args.start_date, args.end_date, args.repeat)
+
+    if args.path.endswith('.parquet') and '://' not in args.path:
+        # Streaming reads the file batch by batch in this process
+        results['stream'], timings['stream'] = time_detector(
+            lambda path, start, end: stream_player_errors(path, start, end, workers=1),
+            args.path, args.start_date, args.end_date, args.repeat)
+
+    for name, result in results.items():
+        if result != reference:
+            print(f"MISMATCH: {len(reference - result)} only in reference, "
+                  f"{len(result - reference)} only in {name}")
+            raise SystemExit(1)
+
+    print(f"\nAll detectors agree on {len(reference):,} error(s)\n")
+    print(f"{'detector':12s} {'seconds':>10s} {'rows/sec':>14s} {'speedup':>9s}")
+    for name, elapsed in timings.items():
+        print(f"{name:12s} {elapsed:10.3f} {len(df) / elapsed:14,.0f} {reference_time / elapsed:8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
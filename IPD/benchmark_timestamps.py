@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-key timestamp parsing against one vectorized parse of the key column
+"""
+
+import argparse
+import time
+
+import polars as pl
+
+from detect_errors import DATA_PATH, _to_date, is_timestamp_in_range, observation_entries, parse_timestamps
+
+
+def per_call(keys, start_date, end_date):
+    """Range check and date bucket for every key, one Python call each."""
+    return [key.split(" ")[0] for key in keys if is_timestamp_in_range(key, start_date, end_date)]
+
+
+def vectorized(keys, start_date, end_date):
+    """Parse the key column once, then filter and bucket on the typed column."""
+    ts_date = parse_timestamps(pl.col('timestamp')).dt.date()
+    frame = pl.DataFrame({'timestamp': keys}).with_columns(ts_date.alias('date'))
+    in_range = frame['date'].is_null()
+    in_range |= (frame['date'] >= _to_date(start_date)) & (frame['date'] <= _to_date(end_date))
+    return frame.filter(in_range)['date'].dt.strftime('%Y-%m-%d').to_list()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('path', nargs='?', default=DATA_PATH, help='parquet file with IPD games')
+    parser.add_argument('--start-date', default='2025-08-01', help="'YYYY-MM-DD' lower bound")
+    parser.add_argument('--end-date', default='2025-08-20', help="'YYYY-MM-DD' upper bound")
+    args = parser.parse_args()
+
+    lf = pl.scan_parquet(args.path).filter(pl.col('observations').str.contains(r'^\s*\{'))
+    keys = observation_entries(lf).select('timestamp').collect()['timestamp'].to_list()
+    print(f"Observation keys: {len(keys):,}")
+
+    results = {}
+    print(f"\n{'method':12s} {'seconds':>9s} {'ns/key':>9s}")
+    for name, method in (('per-call', per_call), ('vectorized', vectorized)):
+        start = time.perf_counter()
+        results[name] = method(keys, args.start_date, args.end_date)
+        elapsed = time.perf_counter() - start
+        print(f"{name:12s} {elapsed:9.3f} {elapsed / len(keys) * 1e9:9.0f}")
+
+    if results['per-call'] != results['vectorized']:
+        print("MISMATCH: per-call and vectorized parsing disagree")
+        raise SystemExit(1)
+    print(f"\nBoth keep {len(results['vectorized']):,} keys in [{args.start_date}, {args.end_date}]")
+
+
+if __name__ == '__main__':
+    main()
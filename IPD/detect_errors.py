@@ -1,10 +1,42 @@
 import re
 import json
-from typing import Union, Optional, Set, Tuple
-from datetime import datetime
+import glob
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Union, Optional, Set, Tuple, Sequence, List
+from datetime import date, datetime, timedelta, timezone
 
 import polars as pl
 import pandas as pd
+import pyarrow.parquet as pq
+
+from mgc_common.instrument import count, enable, enabled, span
+# Shared with secret-mafia so both projects read the same UTC time from a key
+from mgc_common.timestamps import parse_timestamp, parse_timestamps
+
+
+DATA_PATH = r'hf://datasets/bobbycxy/mgc2025-threeplayeripd/threeplayeripd.parquet'
+
+# Pattern to match "[player_id] [An error occurred:"
+ERROR_PATTERN = r'\[(\d+)\]\s*\[An error occurred:'
+
+# Streaming mode decodes at most this much uncompressed parquet data per batch and worker
+STREAM_MEMORY_BUDGET = 256 * 1024 * 1024
+
+# Observations are a JSON object keyed by timestamp. Rewriting every key into a
+# "timestamp" field turns the object into a list of fixed-shape structs, which
+# Polars can decode natively instead of inferring one struct field per timestamp.
+_OBS_KEY_PATTERN = r'([{,]\s*)"(\d{4}-\d{2}-\d{2}[^"\\]*)"\s*:\s*\{'
+# Keys of object entries, and the keys that are well-formed timestamps
+_ENTRY_KEY_PATTERN = r'"\s*:\s*\{'
+_TIMESTAMP_KEY_PATTERN = r'"\d{4}-\d{2}-\d{2}(?:[ T]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}(?::?\d{2})?)?)?"\s*:\s*\{'
+_OBS_ENTRIES_DTYPE = pl.List(pl.Struct({
+    'timestamp': pl.String,
+    'observation': pl.String,
+    'action': pl.String,
+}))
+_HITS_SCHEMA = {'date': pl.String, 'game_id': pl.Int64, 'player_id': pl.Int64}
 
 
 def detect_player_errors(df: pl.DataFrame, start_date: Optional[Union[str, datetime]]=None, end_date: Optional[Union[str, datetime]]=None) -> Set[Tuple[str, int, int]]:
@@ -20,47 +52,406 @@ def detect_player_errors(df: pl.DataFrame, start_date: Optional[Union[str, datet
         Set[str, int, int]: A set of tuples containing (date, game_id, player_id) for games with errors.
     """
     errors = []
-
-    for row in df.iter_rows(named=True):
-        game_id = row.get('game_id')
-        observations = row.get('observations')
-
-        # Try to parse observations as JSON
-        try:
-            obs_data = json.loads(observations)
-        except json.JSONDecodeError:
-            # If it's not valid JSON, try to find errors using regex
-            player_errors = find_errors_in_text(observations)
-            for player_id in player_errors:
-                errors.append((game_id, player_id))
-            continue
-
-        # If observations is a dict, check for errors
-        if isinstance(obs_data, dict):
-            game_in_date_range = False
-
-            for timestamp, content in obs_data.items():
-                # Check if timestamp is within date range
-                if start_date or end_date:
-                    if not is_timestamp_in_range(timestamp, start_date, end_date):
-                        continue
-                    game_in_date_range = True
-                else:
-                    game_in_date_range = True
-
-                if isinstance(content, dict) and 'observation' in content:
-                    obs_text = content['observation']
-                    player_errors = find_errors_in_text(obs_text)
-                    for player_id in player_errors:
-                        errors.append((timestamp.split(" ")[0], game_id, player_id))
-
-            # Skip this game if no timestamps matched the date range
-            if (start_date or end_date) and not game_in_date_range:
+    # Parse the bounds once instead of on every `is_timestamp_in_range` call
+    start_date = _to_date(start_date) if start_date else None
+    end_date = _to_date(end_date) if end_date else None
+    text_rows = entries = 0
+
+    with span('ipd.detect_player_errors', rows=len(df)):
+        for row in df.iter_rows(named=True):
+            game_id = row.get('game_id')
+            observations = row.get('observations')
+
+            # Try to parse observations as JSON
+            try:
+                obs_data = json.loads(observations)
+            except json.JSONDecodeError:
+                # If it's not valid JSON, try to find errors using regex
+                text_rows += 1
+                player_errors = find_errors_in_text(observations)
+                for player_id in player_errors:
+                    errors.append((None, game_id, player_id))
                 continue
 
+            # If observations is a dict, check for errors
+            if isinstance(obs_data, dict):
+                game_in_date_range = False
+                entries += len(obs_data)
+
+                for timestamp, content in obs_data.items():
+                    # Parse the key once, for both the range check and the UTC date bucket
+                    ts = parse_timestamp(timestamp)
+
+                    # Check if timestamp is within date range
+                    if start_date or end_date:
+                        if not _in_range(ts, start_date, end_date):
+                            continue
+                        game_in_date_range = True
+                    else:
+                        game_in_date_range = True
+
+                    if isinstance(content, dict) and 'observation' in content:
+                        obs_text = content['observation']
+                        player_errors = find_errors_in_text(obs_text)
+                        for player_id in player_errors:
+                            errors.append((_date_key(ts, timestamp), game_id, player_id))
+
+                # Skip this game if no timestamps matched the date range
+                if (start_date or end_date) and not game_in_date_range:
+                    continue
+
+    count('ipd.rows', len(df))
+    count('ipd.observations', entries)
+    count('ipd.non_json_rows', text_rows)
     return set(errors)  # remove duplicates
 
 
+def detect_player_errors_vectorized(df: pl.DataFrame, start_date: Optional[Union[str, datetime]]=None, end_date: Optional[Union[str, datetime]]=None) -> Set[Tuple[str, int, int]]:
+    """
+    Columnar equivalent of `detect_player_errors`.
+
+    The JSON decode, the explode into one row per observation and the error match all run as
+    Polars expressions, so no Python code is executed per row. `detect_player_errors` is kept
+    as the reference implementation, and the few values the columnar decode cannot take are
+    handed to it; both return the same set.
+
+    Args:
+        df (pl.DataFrame): a polars DataFrame with `game_id` and `observations` columns
+        start_date (Union[str, datetime]): Optional start date filter (string in format 'YYYY-MM-DD' or datetime)
+        end_date (Union[str, datetime]): Optional end date filter (string in format 'YYYY-MM-DD' or datetime)
+
+    Returns:
+        Set[str, int, int]: A set of tuples containing (date, game_id, player_id) for games with errors.
+    """
+    with span('ipd.detect_player_errors_vectorized', rows=len(df)):
+        hits = error_hits(df.lazy(), start_date, end_date).collect()
+    return set(hits.iter_rows())
+
+
+def error_hits(lf: pl.LazyFrame, start_date: Optional[Union[str, datetime]]=None, end_date: Optional[Union[str, datetime]]=None) -> pl.LazyFrame:
+    """
+    Builds the lazy query behind `detect_player_errors_vectorized`.
+
+    Args:
+        lf (pl.LazyFrame): frame with `game_id` and `observations` columns
+        start_date (Union[str, datetime]): Optional start date filter (string in format 'YYYY-MM-DD' or datetime)
+        end_date (Union[str, datetime]): Optional end date filter (string in format 'YYYY-MM-DD' or datetime)
+
+    Returns:
+        pl.LazyFrame: unique `date`, `game_id`, `player_id` rows, one per detected error.
+    """
+    start_date = _to_date(start_date) if start_date else None
+    end_date = _to_date(end_date) if end_date else None
+
+    # Rows without the error marker can never produce a hit, so drop them before any decoding
+    lf = lf.select('game_id', 'observations').filter(
+        pl.col('observations').str.contains('[An error occurred:', literal=True)
+    )
+    if start_date or end_date:
+        lf = _games_overlapping_window(lf, start_date, end_date)
+    decoded = _with_entries(lf)
+
+    entries = _explode_entries(decoded.filter(pl.col('entry').is_not_null()))
+    if start_date or end_date:
+        # Timestamps that cannot be parsed are kept, as in `is_timestamp_in_range`
+        ts_date = pl.col('time').dt.date()
+        in_range = pl.lit(True)
+        if start_date:
+            in_range = in_range & (ts_date >= start_date)
+        if end_date:
+            in_range = in_range & (ts_date <= end_date)
+        entries = entries.filter(in_range | ts_date.is_null())
+
+    json_hits = (
+        entries.select(
+            pl.coalesce(
+                pl.col('time').dt.strftime('%Y-%m-%d'),
+                pl.col('timestamp').str.split(' ').list.first(),
+            ).alias('date'),
+            'game_id',
+            pl.col('observation').str.extract_all(ERROR_PATTERN).alias('match'),
+        )
+        .explode('match')
+        .drop_nulls('match')
+        .select(
+            'date',
+            'game_id',
+            pl.col('match').str.extract(r'\[(\d+)\]', 1).cast(pl.Int64).alias('player_id'),
+        )
+    )
+    # Everything the columnar decode cannot take (text that is not JSON, JSON that is not an
+    # object, keys that are not timestamps, entries that are not objects) is rare, and goes
+    # row by row through the reference implementation so both paths agree on it
+    fallback_hits = decoded.filter(pl.col('entry').is_null()).select('game_id', 'observations').map_batches(
+        lambda df: _reference_hits(df, start_date, end_date), schema=_HITS_SCHEMA,
+    )
+
+    return pl.concat([json_hits, fallback_hits], how='vertical_relaxed').unique()
+
+
+def observation_entries(lf: pl.LazyFrame) -> pl.LazyFrame:
+    """
+    Explodes JSON observations into one row per timestamped entry with a typed `time` column.
+
+    Every key is parsed once, column-wise, with `parse_timestamps`; filtering, date bucketing
+    and ordering then work on `time` instead of re-parsing the key strings. Values that are not
+    JSON objects of timestamped entries are left out.
+
+    Args:
+        lf (pl.LazyFrame): frame with `game_id` and JSON-object `observations` columns
+
+    Returns:
+        pl.LazyFrame: `game_id`, `timestamp`, `time` (UTC, null if unparseable), `observation`
+        and `action` rows
+    """
+    return _explode_entries(_with_entries(lf).filter(pl.col('entry').is_not_null()))
+
+
+def _with_entries(lf: pl.LazyFrame) -> pl.LazyFrame:
+    """
+    Adds the decoded observations as an `entry` list column.
+
+    Args:
+        lf (pl.LazyFrame): frame with an `observations` column
+
+    Returns:
+        pl.LazyFrame: the frame with `entry`, null where `observations` is not a JSON object of
+        timestamped entries
+    """
+    is_object = pl.col('observations').str.contains(r'^\s*\{')
+    return lf.with_columns(
+        pl.when(is_object)
+        .then(
+            pl.col('observations')
+            .str.replace_all(_OBS_KEY_PATTERN, '${1}{"timestamp":"${2}",')
+            .str.replace(r'^\s*\{', '[')
+            .str.replace(r'\}\s*$', ']')
+        )
+        .map_batches(_decode_entries, return_dtype=_OBS_ENTRIES_DTYPE, is_elementwise=True)
+        .alias('entry')
+    )
+
+
+def _decode_entries(arrays: pl.Series) -> pl.Series:
+    """
+    Decodes rewritten observations, with null for every value that does not decode.
+
+    `str.json_decode` fails the whole batch on a single bad value, so a failing batch is split
+    in halves until the bad values are isolated; a clean batch still costs one decode.
+
+    Args:
+        arrays (pl.Series): observations rewritten into JSON arrays of entries
+
+    Returns:
+        pl.Series: `_OBS_ENTRIES_DTYPE` values, null where the decode failed
+    """
+    try:
+        return arrays.str.json_decode(_OBS_ENTRIES_DTYPE)
+    except pl.exceptions.ComputeError:
+        if len(arrays) == 1:
+            return pl.Series(arrays.name, [None], dtype=_OBS_ENTRIES_DTYPE)
+        middle = len(arrays) // 2
+        return pl.concat([_decode_entries(arrays[:middle]), _decode_entries(arrays[middle:])])
+
+
+def _explode_entries(decoded: pl.LazyFrame) -> pl.LazyFrame:
+    """
+    Explodes decoded `entry` lists into one row per entry and parses the keys into `time`.
+
+    Args:
+        decoded (pl.LazyFrame): frame with `game_id` and a non-null `entry` column
+
+    Returns:
+        pl.LazyFrame: `game_id`, `timestamp`, `observation`, `action` and `time` rows
+    """
+    return (
+        decoded.select('game_id', 'entry')
+        .explode('entry')
+        .unnest('entry')
+        .with_columns(parse_timestamps(pl.col('timestamp')).alias('time'))
+    )
+
+
+def _reference_hits(df: pl.DataFrame, start_date: Optional[date], end_date: Optional[date]) -> pl.DataFrame:
+    """
+    Runs `detect_player_errors` over a batch and returns its hits as a frame.
+
+    Args:
+        df (pl.DataFrame): rows with `game_id` and `observations` columns
+        start_date (date): Optional inclusive lower bound
+        end_date (date): Optional inclusive upper bound
+
+    Returns:
+        pl.DataFrame: `date`, `game_id`, `player_id` rows in `_HITS_SCHEMA`
+    """
+    hits = detect_player_errors(df, start_date, end_date) if len(df) else set()
+    return pl.DataFrame(list(hits), schema=_HITS_SCHEMA, orient='row')
+
+
+def scan_player_errors(source: str, start_date: Optional[Union[str, datetime]]=None, end_date: Optional[Union[str, datetime]]=None) -> Set[Tuple[str, int, int]]:
+    """
+    Lazily scans a parquet or CSV file and detects which players generated errors.
+
+    The date window is compiled once into a typed predicate and pushed into the scan, so games
+    whose observations all fall outside the window are dropped before their JSON is decoded.
+
+    Args:
+        source (str): path or URL of a parquet or CSV file
+        start_date (Union[str, datetime]): Optional start date filter (string in format 'YYYY-MM-DD' or datetime)
+        end_date (Union[str, datetime]): Optional end date filter (string in format 'YYYY-MM-DD' or datetime)
+
+    Returns:
+        Set[str, int, int]: A set of tuples containing (date, game_id, player_id) for games with errors.
+    """
+    lf = pl.scan_parquet(source) if source.endswith('.parquet') else pl.scan_csv(source)
+    with span('ipd.scan_player_errors', source=source):
+        hits = error_hits(lf, start_date, end_date).collect()
+    count('ipd.hits', len(hits))
+    return set(hits.iter_rows())
+
+
+def stream_player_errors(sources: Union[str, Sequence[str]], start_date: Optional[Union[str, datetime]]=None, end_date: Optional[Union[str, datetime]]=None, workers: Optional[int]=None, memory_budget: int=STREAM_MEMORY_BUDGET) -> Set[Tuple[str, int, int]]:
+    """
+    Detects player errors across parquet shards with bounded memory.
+
+    Each shard is read in record batches sized so that one batch stays under `memory_budget`
+    bytes of uncompressed data, and every batch goes through the same query as
+    `detect_player_errors_vectorized`. Shards are processed concurrently, one per worker
+    process, and their hits are folded into a single set as each shard finishes.
+
+    Args:
+        sources (Union[str, Sequence[str]]): glob pattern(s) or paths of local parquet shards
+        start_date (Union[str, datetime]): Optional start date filter (string in format 'YYYY-MM-DD' or datetime)
+        end_date (Union[str, datetime]): Optional end date filter (string in format 'YYYY-MM-DD' or datetime)
+        workers (int): Optional number of worker processes, one shard each (default: one per CPU)
+        memory_budget (int): Approximate uncompressed bytes decoded at once by each worker
+
+    Returns:
+        Set[str, int, int]: A set of tuples containing (date, game_id, player_id) for games with errors.
+    """
+    shards = expand_shards(sources)
+    workers = min(len(shards), workers or multiprocessing.cpu_count())
+    errors = set()
+    # Row counts come from the parquet footers, read only when instrumented
+    rows = sum(pq.ParquetFile(shard).metadata.num_rows for shard in shards) if enabled() else None
+
+    with span('ipd.stream_player_errors', rows=rows, shards=len(shards), workers=workers):
+        if workers <= 1:
+            for shard in shards:
+                with span('ipd.shard', shard=shard):
+                    errors.update(_shard_errors(shard, start_date, end_date, memory_budget))
+            return errors
+
+        # Polars runs its own thread pool, which must not be inherited through fork
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            futures = [pool.submit(_shard_errors, shard, start_date, end_date, memory_budget) for shard in shards]
+            for future in as_completed(futures):
+                errors.update(future.result())
+    return errors
+
+
+def expand_shards(sources: Union[str, Sequence[str]]) -> List[str]:
+    """
+    Expands glob patterns into a sorted list of shard paths.
+
+    Args:
+        sources (Union[str, Sequence[str]]): glob pattern(s) or paths
+
+    Returns:
+        List[str]: The matching paths, each listed once
+
+    Raises:
+        FileNotFoundError: If a pattern matches no file
+    """
+    shards = []
+    for pattern in ([sources] if isinstance(sources, str) else sources):
+        matches = sorted(glob.glob(pattern))
+        if not matches:
+            raise FileNotFoundError(f"No parquet shards match {pattern!r}")
+        shards.extend(match for match in matches if match not in shards)
+    return shards
+
+
+def _shard_errors(path: str, start_date: Optional[Union[str, datetime]], end_date: Optional[Union[str, datetime]], memory_budget: int) -> Set[Tuple[str, int, int]]:
+    """
+    Scans one parquet shard batch by batch.
+
+    Args:
+        path (str): path of the parquet shard
+        start_date (Union[str, datetime]): Optional start date filter
+        end_date (Union[str, datetime]): Optional end date filter
+        memory_budget (int): Approximate uncompressed bytes decoded per batch
+
+    Returns:
+        Set[str, int, int]: The (date, game_id, player_id) hits of the shard
+    """
+    parquet = pq.ParquetFile(path)
+    metadata = parquet.metadata
+    total_bytes = sum(metadata.row_group(i).total_byte_size for i in range(metadata.num_row_groups))
+    row_bytes = max(1, total_bytes // max(1, metadata.num_rows))
+    batch_rows = max(1, memory_budget // row_bytes)
+
+    errors = set()
+    for batch in parquet.iter_batches(batch_size=batch_rows, columns=['game_id', 'observations']):
+        hits = error_hits(pl.from_arrow(batch).lazy(), start_date, end_date).collect()
+        errors.update(hits.iter_rows())
+    return errors
+
+
+def _games_overlapping_window(lf: pl.LazyFrame, start_date: Optional[date], end_date: Optional[date]) -> pl.LazyFrame:
+    """
+    Drops the games whose observation keys all fall outside the window.
+
+    Only the keys are matched, the observation bodies are not decoded. Games with no timestamp
+    key are kept so the per-observation filter can decide, and so are games with a key that is
+    not a timestamp or text that is not a closed object: the per-observation filter and the
+    reference fallback keep their entries whatever the window. A key's local date can differ
+    from its UTC date by a day either way, so the bounds are widened by one day; the exact UTC
+    filter runs on the decoded entries.
+
+    Args:
+        lf (pl.LazyFrame): frame with an `observations` column
+        start_date (date): Optional inclusive lower bound
+        end_date (date): Optional inclusive upper bound
+
+    Returns:
+        pl.LazyFrame: `lf` without the games entirely outside the window
+    """
+    # 'YYYY-MM-DD' strings order like the dates; skip the '"' before each key
+    low = (start_date - timedelta(days=1)).isoformat() if start_date else '0000-00-00'
+    high = (end_date + timedelta(days=1)).isoformat() if end_date else '9999-99-99'
+    observations = pl.col('observations')
+    keys = pl.col('_timestamp_keys')
+    # The keys are extracted once into a column; an expression would be re-evaluated per use
+    return (
+        lf.with_columns(observations.str.extract_all(_TIMESTAMP_KEY_PATTERN).alias('_timestamp_keys'))
+        .filter(
+            keys.list.eval(pl.element().str.slice(1, 10).is_between(pl.lit(low), pl.lit(high))).list.any()
+            | (keys.list.len() == 0)
+            | (observations.str.count_matches(_ENTRY_KEY_PATTERN) != keys.list.len())
+            | ~observations.str.strip_chars_end().str.ends_with('}')
+        )
+        .drop('_timestamp_keys')
+    )
+
+
+def _to_date(value: Union[str, datetime, date]) -> date:
+    """
+    Normalizes a date filter bound to a `date`.
+
+    Args:
+        value (Union[str, datetime, date]): string in 'YYYY-MM-DD' format, datetime or date
+
+    Returns:
+        date: The calendar date of the bound
+    """
+    if isinstance(value, str):
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
 def find_errors_in_text(text: str) -> Set[int]:
     """
     Extracts player IDs that generated errors from observation text.
@@ -75,9 +466,7 @@ def find_errors_in_text(text: str) -> Set[int]:
     """
     player_errors = set()
 
-    # Pattern to match "[player_id] [An error occurred:"
-    pattern = r'\[(\d+)\]\s*\[An error occurred:'
-    matches = re.finditer(pattern, text)
+    matches = re.finditer(ERROR_PATTERN, text)
 
     for match in matches:
         player_id = int(match.group(1))
@@ -92,43 +481,82 @@ def is_timestamp_in_range(timestamp: Union[str, datetime], start_date: Optional[
 
     Args:
         timestamp (Union[str, datetime]): Timestamp string (e.g., '2025-08-18 02:22:29.7802+00')
-        start_date (Union[str, datetime]): Start date (string in 'YYYY-MM-DD' format or datetime object)
-        end_date (Union[str, datetime]): End date (string in 'YYYY-MM-DD' format or datetime object)
+        start_date (Union[str, datetime]): Start date (string in 'YYYY-MM-DD' format, datetime or date object)
+        end_date (Union[str, datetime]): End date (string in 'YYYY-MM-DD' format, datetime or date object)
 
     Returns:
         bool: Boolean indicating if timestamp is in range
     """
-    try:
-        ts = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-        ts_date = ts.date()
+    ts = timestamp if isinstance(timestamp, datetime) else parse_timestamp(timestamp)
+    return _in_range(ts, start_date, end_date)
 
-        if start_date:
-            if isinstance(start_date, str):
-                start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-            if ts_date < start_date:
-                return False
 
-        if end_date:
-            if isinstance(end_date, str):
-                end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-            if ts_date > end_date:
-                return False
-        return True
-    except (ValueError, AttributeError):
-        # If timestamp parsing fails, include it by default
+def _in_range(ts: Optional[datetime], start_date: Optional[Union[str, datetime]], end_date: Optional[Union[str, datetime]]) -> bool:
+    """
+    Checks a parsed timestamp against the date bounds.
+
+    Args:
+        ts (Optional[datetime]): Parsed timestamp, None if the key could not be parsed
+        start_date (Union[str, datetime]): Optional inclusive lower bound
+        end_date (Union[str, datetime]): Optional inclusive upper bound
+
+    Returns:
+        bool: True if in range; unparseable timestamps are included by default
+    """
+    if ts is None:
         return True
+    ts_date = ts.astimezone(timezone.utc).date() if ts.tzinfo else ts.date()
+    if start_date and ts_date < _to_date(start_date):
+        return False
+    if end_date and ts_date > _to_date(end_date):
+        return False
+    return True
 
 
-def main():
-    path = r'hf://datasets/bobbycxy/mgc2025-threeplayeripd/threeplayeripd.parquet'
-    df = pl.read_parquet(path) if path.endswith('.parquet') else pl.read_csv(path)
+def _date_key(ts: Optional[datetime], timestamp: str) -> str:
+    """
+    Buckets an observation key by calendar date.
 
-    # Filter by date range to select phase 2 (use None to skip filtering)
-    start_date = None  # e.g., '2025-08-01'
-    end_date = None  # e.g., '2025-08-20'
+    Args:
+        ts (Optional[datetime]): Parsed timestamp, None if the key could not be parsed
+        timestamp (str): The original key
 
-    errors = detect_player_errors(df, start_date, end_date)
-    pd.DataFrame(errors, columns=["date", "game_id", "player"]).to_csv(r"./detected_errors.csv")
+    Returns:
+        str: The UTC date as 'YYYY-MM-DD', or the key's date part if it could not be parsed
+    """
+    if ts is None:
+        return timestamp.split(" ")[0]
+    return (ts.astimezone(timezone.utc) if ts.tzinfo else ts).strftime('%Y-%m-%d')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Detect which IPD players generated errors")
+    parser.add_argument('sources', nargs='*', default=[DATA_PATH],
+                        help='parquet or CSV file; with --stream, glob(s) of parquet shards')
+    # Filter by date range to select phase 2 (omit to skip filtering)
+    parser.add_argument('--start-date', default=None, help="optional 'YYYY-MM-DD' lower bound, e.g. 2025-08-01")
+    parser.add_argument('--end-date', default=None, help="optional 'YYYY-MM-DD' upper bound, e.g. 2025-08-20")
+    parser.add_argument('--stream', action='store_true', help='scan local shards batch by batch with bounded memory')
+    parser.add_argument('--workers', type=int, default=None, help='shards scanned concurrently (default: one per CPU)')
+    parser.add_argument('--memory-mb', type=int, default=STREAM_MEMORY_BUDGET // (1024 * 1024),
+                        help='uncompressed MB decoded at once per worker in --stream mode')
+    parser.add_argument('--profile', metavar='PATH', help='write per-stage times, rows, throughput and RSS as JSON')
+    parser.add_argument('--trace', metavar='PATH', help='write a Chrome trace of the stages')
+    args = parser.parse_args()
+    if args.profile or args.trace:
+        enable(args.profile, args.trace)
+
+    if args.stream:
+        errors = stream_player_errors(args.sources, args.start_date, args.end_date,
+                                      workers=args.workers, memory_budget=args.memory_mb * 1024 * 1024)
+    else:
+        errors = set()
+        for source in args.sources:
+            errors.update(scan_player_errors(source, args.start_date, args.end_date))
+    # Undated hits (values that are not JSON) sort first
+    errors = sorted(errors, key=lambda error: (error[0] or '', error[1], error[2]))
+    with span('ipd.write_csv', rows=len(errors)):
+        pd.DataFrame(errors, columns=["date", "game_id", "player"]).to_csv(r"./detected_errors.csv")
 
     if errors:
         print(f"Found {len(errors)} error(s):\n")
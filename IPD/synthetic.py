@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Deterministic synthetic three-player IPD games for scale and load testing.
+
+Each game is a few rounds of chat followed by one cooperate/defect decision per
+opponent, scored with the usual prisoner's dilemma payoffs. Every player gets a
+row with the dataset's columns; `observations` is a JSON object keyed by
+'2025-08-18 02:22:29.7802+00' style timestamps, and a player whose model fails
+shows up as a '[pid] [An error occurred: ...]' line in everyone's observations.
+A small fraction of rows hold a value that is not JSON, as in the real dump.
+
+Game i depends only on (seed, i), so runs of any size are reproducible and the
+first N games of a larger run are the same N games.
+
+  python synthetic.py --games 50000 --output synthetic-ipd.parquet
+  python synthetic.py --games 50000 --output shards/ --shards
+"""
+
+import json
+import random
+import argparse
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+SCHEMA = pa.schema([
+    ('player_game_id', pa.int64()),
+    ('game_id', pa.int64()),
+    ('player_id', pa.int64()),
+    ('env_name', pa.string()),
+    ('model_name', pa.string()),
+    ('opponent_names', pa.string()),
+    ('observations', pa.string()),
+    ('rewards', pa.string()),
+    ('num_turns', pa.int64()),
+    ('status', pa.string()),
+    ('reason', pa.string()),
+])
+
+ENV_NAME = 'ThreePlayerIPD-v0'
+PLAYERS = 3
+FIRST_GAME_ID = 200000
+START_TIME = datetime(2025, 8, 1, tzinfo=timezone.utc)
+GAME_INTERVAL = timedelta(seconds=30)
+BATCH_GAMES = 2000
+
+# (my decision, their decision) -> my points
+PAYOFFS = {('cooperate', 'cooperate'): 3, ('cooperate', 'defect'): 0,
+           ('defect', 'cooperate'): 5, ('defect', 'defect'): 1}
+ERROR_MESSAGES = ['Request timed out', 'Rate limit exceeded', 'Connection reset by peer']
+MESSAGES = [
+    "Let's all cooperate this round, it maximizes everyone's points.",
+    'Player {0} defected last time, I will remember that.',
+    'I will cooperate with anyone who cooperates with me.',
+    'Trust is earned. Player {0}, are you in?',
+    'Defecting only pays once. Let us keep it fair.',
+]
+
+
+def parse_args(argv: Optional[List[str]]=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generate deterministic synthetic three-player IPD games")
+    parser.add_argument('--games', type=int, default=5000, help='number of games')
+    parser.add_argument('--rounds', type=int, default=5, help='decision rounds per game')
+    parser.add_argument('--chat-turns', type=int, default=1, help='chat turns per player before each decision')
+    parser.add_argument('--models', type=int, default=20, help='number of distinct models')
+    parser.add_argument('--error-rate', type=float, default=0.01, help='chance that a model call fails')
+    parser.add_argument('--non-json-rate', type=float, default=0.001, help='chance that a row is not JSON')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='synthetic-ipd.parquet',
+                        help='parquet file, or a directory of one shard per day with --shards')
+    parser.add_argument('--shards', action='store_true', help='write one parquet shard per day into --output')
+    return parser.parse_args(argv)
+
+
+def _timestamp(clock: datetime) -> str:
+    # Postgres style: trailing zeros of the fraction dropped, hour-only offset
+    return clock.strftime('%Y-%m-%d %H:%M:%S.%f').rstrip('0').rstrip('.') + '+00'
+
+
+def generate_game(index: int, options: argparse.Namespace, models: List[str]) -> List[Dict]:
+    """
+    Plays one synthetic game.
+
+    Args:
+        index (int): position of the game in the run; it seeds the game
+        options (argparse.Namespace): generator options, as returned by `parse_args`
+        models (List[str]): model names the players are drawn from
+
+    Returns:
+        List[Dict]: one raw row per player
+    """
+    rng = random.Random(f'{options.seed}:{index}')
+    game_id = FIRST_GAME_ID + index
+    clock = START_TIME + index * GAME_INTERVAL + timedelta(seconds=rng.uniform(0, 10))
+    players = rng.sample(models, PLAYERS)
+    cooperativeness = [random.Random(f'{options.seed}:{model}').uniform(0.3, 0.9) for model in players]
+
+    pending = {p: [f'[GAME] You are Player {p} in a 3-player Iterated Prisoner\'s Dilemma. '
+                   f'The game lasts {options.rounds} rounds.'] for p in range(PLAYERS)}
+    entries = {p: {} for p in range(PLAYERS)}
+    scores = [0] * PLAYERS
+
+    def act(player: int, action: str) -> str:
+        nonlocal clock
+        clock += timedelta(seconds=rng.uniform(0.2, 8))
+        if rng.random() < options.error_rate:
+            action = f'An error occurred: {rng.choice(ERROR_MESSAGES)}'
+        entries[player][_timestamp(clock)] = {'observation': '\n'.join(pending[player]), 'action': action}
+        pending[player] = []
+        return action
+
+    def broadcast(line: str) -> None:
+        for p in range(PLAYERS):
+            pending[p].append(line)
+
+    for round_number in range(1, options.rounds + 1):
+        broadcast(f'[GAME] Starting round {round_number}. Conversation phase.')
+        for _ in range(options.chat_turns):
+            for player in range(PLAYERS):
+                other = rng.choice([p for p in range(PLAYERS) if p != player])
+                broadcast(f'[{player}] [{act(player, rng.choice(MESSAGES).format(other))}]')
+
+        broadcast('[GAME] Decision phase: submit e.g. "[1 cooperate] [2 defect]" for each opponent.')
+        decisions = {}
+        for player in range(PLAYERS):
+            choices = {other: 'cooperate' if rng.random() < cooperativeness[player] else 'defect'
+                       for other in range(PLAYERS) if other != player}
+            action = act(player, ' '.join(f'[{other} {choice}]' for other, choice in choices.items()))
+            if action.startswith('An error occurred'):
+                broadcast(f'[{player}] [{action}]')
+                choices = {other: 'defect' for other in choices}
+            decisions[player] = choices
+
+        results = []
+        for player in range(PLAYERS):
+            for other, choice in decisions[player].items():
+                scores[player] += PAYOFFS[choice, decisions[other][player]]
+                if player < other:
+                    results.append(f'Player {player} vs Player {other}: {choice} / {decisions[other][player]}')
+        broadcast(f'[GAME] Round {round_number} results: ' + '; '.join(results))
+
+    best = max(scores)
+    winners = [p for p in range(PLAYERS) if scores[p] == best]
+    rewards = {str(p): (0 if len(winners) > 1 else 1) if p in winners else -1 for p in range(PLAYERS)}
+    reason = (f'Player {winners[0]} won with {best} points.' if len(winners) == 1
+              else f'Draw between players {", ".join(map(str, winners))} with {best} points.')
+
+    rows = []
+    for player in range(PLAYERS):
+        observations = json.dumps(entries[player])
+        if rng.random() < options.non_json_rate:
+            observations = '\n'.join(entry['observation'] for entry in entries[player].values())
+        rows.append({
+            'player_game_id': game_id * PLAYERS + player,
+            'game_id': game_id,
+            'player_id': player,
+            'env_name': ENV_NAME,
+            'model_name': players[player],
+            'opponent_names': json.dumps({str(p): players[p] for p in range(PLAYERS) if p != player}),
+            'observations': observations,
+            'rewards': json.dumps(rewards),
+            'num_turns': options.rounds * (options.chat_turns + 1),
+            'status': 'finished',
+            'reason': reason,
+        })
+    return rows
+
+
+def generate_batches(options: argparse.Namespace, batch_games: int=BATCH_GAMES) -> Iterator[pa.RecordBatch]:
+    """
+    Generates the games as Arrow record batches.
+
+    Args:
+        options (argparse.Namespace): generator options, as returned by `parse_args`
+        batch_games (int): games per batch
+
+    Returns:
+        Iterator[pa.RecordBatch]: batches of `batch_games` games, in game order
+    """
+    models = [f'synthetic/model-{i:03d}' for i in range(options.models)]
+    for first in range(0, options.games, batch_games):
+        rows = []
+        for index in range(first, min(first + batch_games, options.games)):
+            rows.extend(generate_game(index, options, models))
+        yield pa.RecordBatch.from_pylist(rows, schema=SCHEMA)
+
+
+def write_games(options: argparse.Namespace) -> List[str]:
+    """
+    Writes the games to one parquet file, or with `options.shards` to one file per day.
+
+    Args:
+        options (argparse.Namespace): generator options, as returned by `parse_args`
+
+    Returns:
+        List[str]: the paths written
+    """
+    output = Path(options.output)
+    writers = {}
+    try:
+        for batch in generate_batches(options):
+            if not options.shards:
+                parts = {output: batch}
+            else:
+                # A game belongs to the day it started on
+                days = [(START_TIME + (game_id - FIRST_GAME_ID) * GAME_INTERVAL).date()
+                        for game_id in batch.column('game_id').to_pylist()]
+                parts = {output / f'day-{day}.parquet': batch.filter(pa.array([d == day for d in days]))
+                         for day in sorted(set(days))}
+            for path, part in parts.items():
+                if path not in writers:
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    writers[path] = pq.ParquetWriter(path, SCHEMA, compression='zstd')
+                writers[path].write_batch(part)
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return [str(path) for path in writers]
+
+
+def main():
+    options = parse_args()
+    paths = write_games(options)
+    rows = sum(pq.ParquetFile(path).metadata.num_rows for path in paths)
+    print(f"Wrote {options.games:,} games ({rows:,} rows) to {len(paths)} file(s) under {options.output}")
+
+
+if __name__ == '__main__':
+    main()
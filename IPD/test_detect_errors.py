@@ -0,0 +1,90 @@
+"""
+Parity of the reference and vectorized IPD error detectors on values the columnar decode cannot take
+"""
+
+import json
+
+import polars as pl
+import pytest
+
+from detect_errors import detect_player_errors, detect_player_errors_vectorized, scan_player_errors, \
+    stream_player_errors
+
+ERROR = '[1] [An error occurred: Request timed out]'
+
+ROWS = [
+    # A regular game
+    (1, json.dumps({'2025-08-18 02:22:29.7802+00': {'observation': ERROR, 'action': 'x'},
+                    '2025-08-18 02:22:31.1+00': {'observation': '[2] [An error occurred: Rate limit]', 'action': 'y'}})),
+    # Malformed JSON: the reference falls back to a regex over the whole text
+    (2, '{"2025-08-18 02:22:29.7802+00": {"observation": "' + ERROR + '"'),
+    # A value that is not an object
+    (3, json.dumps({'2025-08-18 02:22:29.7802+00': 5, '2025-08-18 02:22:30+00': {'observation': ERROR}})),
+    # A key that is not a timestamp
+    (4, json.dumps({'meta': {'observation': ERROR}, '2025-08-18 02:22:29+00': {'observation': ERROR}})),
+    # JSON that is not an object
+    (5, json.dumps([ERROR])),
+    (6, json.dumps(ERROR)),
+    # Plain text
+    (7, 'Player 0 said hello\n' + ERROR),
+    # Timestamps that cannot be parsed
+    (8, json.dumps({'2025-08-18 not a time': {'observation': ERROR}})),
+    # A non-UTC offset: the UTC date is the day before the key's
+    (9, json.dumps({'2025-08-18 02:22:29.7802+05:30': {'observation': ERROR}})),
+    # ISO keys with a 'T' separator and a 'Z' or colon offset
+    (10, json.dumps({'2025-08-18T02:22:29Z': {'observation': ERROR}})),
+    (11, json.dumps({'2025-08-05T23:30:00.5-01:00': {'observation': ERROR}})),
+    # Keys without an offset or a time
+    (12, json.dumps({'2025-08-18 02:22:29': {'observation': ERROR}, '2025-08-18': {'observation': ERROR}})),
+]
+
+
+WINDOWS = [
+    (None, None), ('2025-08-18', '2025-08-18'), ('2025-08-01', None),
+    # Windows ending on the UTC date of a key whose local date is a day later
+    ('2025-08-17', '2025-08-17'), (None, '2025-08-17'),
+    # A window that only the ISO key of game 11 falls in
+    ('2025-08-01', '2025-08-10'),
+]
+
+
+@pytest.fixture
+def games():
+    return pl.DataFrame(ROWS, schema={'game_id': pl.Int64, 'observations': pl.String}, orient='row')
+
+
+@pytest.mark.parametrize('start_date, end_date', WINDOWS)
+def test_vectorized_matches_reference(games, start_date, end_date):
+    assert detect_player_errors_vectorized(games, start_date, end_date) == \
+        detect_player_errors(games, start_date, end_date)
+
+
+@pytest.mark.parametrize('start_date, end_date', WINDOWS)
+def test_scan_and_stream_match_reference(games, tmp_path, start_date, end_date):
+    path = tmp_path / 'games.parquet'
+    games.write_parquet(path)
+    expected = detect_player_errors(games, start_date, end_date)
+    assert scan_player_errors(str(path), start_date, end_date) == expected
+    assert stream_player_errors(str(path), start_date, end_date, workers=1) == expected
+
+
+def test_undecodable_rows(games):
+    hits = detect_player_errors_vectorized(games)
+    assert (None, 2, 1) in hits
+    assert ('meta', 4, 1) in hits
+    assert not any(game_id in (5, 6) for _, game_id, _ in hits)
+    assert (None, 7, 1) in hits
+
+
+@pytest.mark.parametrize('start_date', [None, '2025-08-01'])
+def test_dates_are_utc_with_or_without_filter(games, start_date):
+    for detector in (detect_player_errors, detect_player_errors_vectorized):
+        assert ('2025-08-17', 9, 1) in detector(games, start_date)
+
+
+def test_iso_keys_bucket_on_their_utc_date(games):
+    for detector in (detect_player_errors, detect_player_errors_vectorized):
+        hits = detector(games)
+        assert ('2025-08-18', 10, 1) in hits
+        assert ('2025-08-06', 11, 1) in hits
+        assert ('2025-08-18', 12, 1) in hits
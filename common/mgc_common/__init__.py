@@ -0,0 +1,6 @@
+"""
+Helpers shared by the IPD and Secret Mafia analysis scripts
+
+Install once with `pip install -e common` from the repository root; both
+directories import from here instead of keeping their own copies.
+"""
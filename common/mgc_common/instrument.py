@@ -0,0 +1,272 @@
+"""
+Lightweight stage instrumentation for the analysis scripts
+
+`span(name, rows=...)` times a stage as a context manager, `traced(name)` does
+the same for a whole function, and `count(name, n)` adds to a counter. Each
+span records its wall time, the RSS before and after, the rows it processed
+and the resulting throughput; nested spans keep their parent.
+
+Instrumentation is off unless enabled, either by `enable()` (mafia.py and
+detect_errors.py --profile/--trace) or by the environment of any script:
+
+  INSTRUMENT_JSON=profile.json    per-stage summary, spans and counters as JSON
+  INSTRUMENT_TRACE=trace.json     Chrome trace events (chrome://tracing, Perfetto)
+
+Both files are written when the process exits. Disabled, `span` returns one
+shared no-op object and `count` returns at once, so instrumented code pays a
+function call per stage and nothing per row.
+"""
+
+import atexit
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from functools import wraps
+from pathlib import Path
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+_STATM = Path('/proc/self/statm')
+_STATUS = Path('/proc/self/status')
+
+_state = {'enabled': False, 'json': None, 'trace': None}
+_spans = []
+_counters = {}
+_stack = threading.local()
+_origin = time.perf_counter()
+_started = time.time()
+
+
+def rss_mb():
+    """Current resident set size in MB (the peak where the current value is unavailable)."""
+    if _STATM.exists():
+        return int(_STATM.read_text().split()[1]) * _PAGE_SIZE / 2**20
+    return peak_rss_mb()
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB."""
+    # Linux carries ru_maxrss over fork and exec, so a child would inherit its parent's
+    # peak; VmHWM belongs to this process image alone
+    if _STATUS.exists():
+        for line in _STATUS.read_text().splitlines():
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 2**10
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 2**20 if sys.platform == 'darwin' else 2**10
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+class Span:
+    """One timed stage; `add(rows)` counts rows processed inside it."""
+
+    __slots__ = ('name', 'args', 'rows', 'start', 'end', 'rss_before', 'rss_after', 'parent', 'thread')
+
+    def __init__(self, name, rows=None, **args):
+        self.name = name
+        self.args = args
+        self.rows = rows
+        self.parent = None
+
+    def add(self, rows):
+        self.rows = (self.rows or 0) + rows
+
+    def __enter__(self):
+        stack = _current_stack()
+        self.parent = stack[-1].name if stack else None
+        stack.append(self)
+        self.thread = threading.get_ident()
+        self.rss_before = rss_mb()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.end = time.perf_counter()
+        self.rss_after = rss_mb()
+        _current_stack().pop()
+        _spans.append(self)
+        return False
+
+    @property
+    def seconds(self):
+        return self.end - self.start
+
+    def to_dict(self, base):
+        row = {
+            'name': self.name,
+            'parent': self.parent,
+            'start': round(self.start - base, 6),
+            'seconds': round(self.seconds, 6),
+            'rss_before_mb': round(self.rss_before, 1),
+            'rss_after_mb': round(self.rss_after, 1),
+        }
+        if self.rows is not None:
+            row['rows'] = self.rows
+            row['rows_per_second'] = round(self.rows / self.seconds, 1) if self.seconds > 0 else None
+        if self.args:
+            row['args'] = self.args
+        return row
+
+
+class _NullSpan:
+    """What `span` returns while instrumentation is off."""
+
+    __slots__ = ()
+
+    def add(self, rows):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+def _base():
+    # Spans passed to `record` may have started before this module was imported
+    return min([_origin] + [recorded.start for recorded in _spans])
+
+
+def _current_stack():
+    if not hasattr(_stack, 'spans'):
+        _stack.spans = []
+    return _stack.spans
+
+
+def enabled():
+    return _state['enabled']
+
+
+def enable(json_path=None, trace_path=None):
+    """Start recording; the reports are written to the given paths at exit."""
+    if not _state['enabled']:
+        atexit.register(write_reports)
+    _state.update(enabled=True, json=json_path or _state['json'], trace=trace_path or _state['trace'])
+
+
+def span(name, rows=None, **args):
+    """Context manager timing one stage; a shared no-op while disabled."""
+    if not _state['enabled']:
+        return NULL_SPAN
+    return Span(name, rows, **args)
+
+
+def traced(name=None):
+    """Decorator running the whole function inside a span (the function's qualified name by default)."""
+    def decorate(function):
+        label = name or f'{function.__module__}.{function.__qualname__}'
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _state['enabled']:
+                return function(*args, **kwargs)
+            with Span(label):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(name, n=1):
+    """Add `n` to a named counter."""
+    if _state['enabled']:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def record(name, seconds, rows=None, **args):
+    """Add a span measured elsewhere, e.g. in a worker process, ending now."""
+    if not _state['enabled']:
+        return
+    finished = Span(name, rows, **args)
+    stack = _current_stack()
+    finished.parent = stack[-1].name if stack else None
+    finished.thread = threading.get_ident()
+    finished.end = time.perf_counter()
+    finished.start = finished.end - seconds
+    finished.rss_before = finished.rss_after = rss_mb()
+    _spans.append(finished)
+
+
+def summary():
+    """Per-stage totals in first-seen order: calls, seconds, rows and throughput."""
+    stages = {}
+    for recorded in sorted(_spans, key=lambda s: s.start):
+        stage = stages.setdefault(recorded.name, {'name': recorded.name, 'calls': 0, 'seconds': 0.0,
+                                                  'max_rss_mb': 0.0, 'rss_delta_mb': 0.0})
+        stage['calls'] += 1
+        stage['seconds'] += recorded.seconds
+        stage['max_rss_mb'] = max(stage['max_rss_mb'], recorded.rss_after)
+        stage['rss_delta_mb'] += recorded.rss_after - recorded.rss_before
+        if recorded.rows is not None:
+            stage['rows'] = stage.get('rows', 0) + recorded.rows
+    for stage in stages.values():
+        if 'rows' in stage and stage['seconds'] > 0:
+            stage['rows_per_second'] = round(stage['rows'] / stage['seconds'], 1)
+        stage['seconds'] = round(stage['seconds'], 6)
+        stage['max_rss_mb'] = round(stage['max_rss_mb'], 1)
+        stage['rss_delta_mb'] = round(stage['rss_delta_mb'], 1)
+    return list(stages.values())
+
+
+def report():
+    """Everything recorded so far as one JSON-serializable dict."""
+    base = _base()
+    return {
+        'script': Path(sys.argv[0]).name,
+        'argv': sys.argv[1:],
+        'started': _started,
+        'wall_seconds': round(time.perf_counter() - base, 6),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'stages': summary(),
+        'counters': dict(_counters),
+        'spans': [recorded.to_dict(base) for recorded in sorted(_spans, key=lambda s: s.start)],
+    }
+
+
+def chrome_trace():
+    """The spans as Chrome trace complete events, plus the counters' final values."""
+    pid = os.getpid()
+    base = _base()
+    events = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'args': {'name': Path(sys.argv[0]).name}}]
+    for recorded in _spans:
+        args = dict(recorded.args, rss_before_mb=round(recorded.rss_before, 1),
+                    rss_after_mb=round(recorded.rss_after, 1))
+        if recorded.rows is not None:
+            args['rows'] = recorded.rows
+        events.append({'name': recorded.name, 'ph': 'X', 'pid': pid, 'tid': recorded.thread,
+                       'ts': (recorded.start - base) * 1e6, 'dur': recorded.seconds * 1e6, 'args': args})
+        # RSS as a counter track, sampled at the edges of every span
+        for at, value in ((recorded.start, recorded.rss_before), (recorded.end, recorded.rss_after)):
+            events.append({'name': 'rss_mb', 'ph': 'C', 'pid': pid, 'ts': (at - base) * 1e6,
+                           'args': {'rss_mb': round(value, 1)}})
+    end = (time.perf_counter() - base) * 1e6
+    for name, value in _counters.items():
+        events.append({'name': name, 'ph': 'C', 'pid': pid, 'ts': end, 'args': {name: value}})
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+
+def write_reports():
+    if _state['json']:
+        Path(_state['json']).write_text(json.dumps(report(), indent=2))
+        print(f"[instrument] stage profile written to {_state['json']}", file=sys.stderr)
+    if _state['trace']:
+        Path(_state['trace']).write_text(json.dumps(chrome_trace()))
+        print(f"[instrument] Chrome trace written to {_state['trace']}", file=sys.stderr)
+
+
+def _enable_from_environment():
+    import multiprocessing
+
+    # Worker processes inherit the environment; only the main process writes the reports.
+    # A spawned worker has its name before it imports anything, unlike its parent_process()
+    if multiprocessing.current_process().name == 'MainProcess':
+        enable(os.environ.get('INSTRUMENT_JSON'), os.environ.get('INSTRUMENT_TRACE'))
+
+
+if os.environ.get('INSTRUMENT_JSON') or os.environ.get('INSTRUMENT_TRACE'):
+    _enable_from_environment()
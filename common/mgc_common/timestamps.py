@@ -0,0 +1,73 @@
+"""
+Observation timestamp keys, parsed the same way by IPD and Secret Mafia
+
+Keys look like '2025-08-18 02:22:29.7802+00': a variable-length fraction and a
+Postgres-style hour-only offset. ISO keys such as '2025-08-18T02:22:29Z' are
+accepted too, and a key without an offset is taken as UTC.
+
+`parse_timestamp` parses one key in Python and is the definition of what a key
+means; `parse_timestamps` is the columnar Polars version. It parses the common
+shapes natively and hands only the keys it could not parse to
+`parse_timestamp`, so both always agree on the UTC time of a key.
+"""
+
+import re
+from datetime import datetime, timezone
+from typing import Optional
+
+import polars as pl
+
+# `%#z` accepts '+00', '+0530' and '+05:30'; 'T' and 'Z' are rewritten to ' ' and '+00' first
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S%.f%#z'
+NAIVE_TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S%.f'
+TIME_DTYPE = pl.Datetime('us', 'UTC')
+
+_OFFSET_PATTERN = re.compile(r'([+-]\d{2})$')
+_FRACTION_PATTERN = re.compile(r'\.(\d+)')
+_DATE_PREFIX = r'^\d{4}-\d{2}-\d{2}'
+
+
+def parse_timestamp(timestamp: str) -> Optional[datetime]:
+    """Parse one key, including '+00' offsets, on any Python version; None if it is not a timestamp."""
+    if not isinstance(timestamp, str):
+        return None
+    text = _OFFSET_PATTERN.sub(r'\1:00', timestamp.replace('Z', '+00:00'))
+    # Older `fromisoformat` only accepts 3 or 6 fractional digits
+    text = _FRACTION_PATTERN.sub(lambda m: '.' + m.group(1)[:6].ljust(6, '0'), text, count=1)
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        return None
+
+
+def to_utc(ts: Optional[datetime]) -> Optional[datetime]:
+    """A parsed key as an aware UTC datetime; keys without an offset are UTC already."""
+    if ts is None:
+        return None
+    return ts.astimezone(timezone.utc) if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+def parse_timestamps(timestamps: pl.Expr) -> pl.Expr:
+    """Parse a column of keys into `Datetime('us', 'UTC')`, null where a key is not a timestamp."""
+    parsed = timestamps.str.to_datetime(TIMESTAMP_FORMAT, time_unit='us', time_zone='UTC', strict=False)
+    return pl.struct(parsed.alias('time'), timestamps.alias('key')).map_batches(
+        _parse_rest, return_dtype=TIME_DTYPE, is_elementwise=True)
+
+
+def _parse_rest(parsed: pl.Series) -> pl.Series:
+    """Parse the keys `TIMESTAMP_FORMAT` missed: ISO 'T'/'Z' keys natively, the rare others with `parse_timestamp`."""
+    times, keys = parsed.struct.field('time'), parsed.struct.field('key')
+    # Polars also takes a lowercase 'z' offset, which `fromisoformat` rejects
+    times = times.zip_with(~keys.str.contains('z', literal=True).fill_null(False), pl.Series([None], dtype=TIME_DTYPE))
+    rest = (times.is_null() & keys.str.contains(_DATE_PREFIX)).arg_true()
+    if not len(rest):
+        return times
+    normalized = (keys.gather(rest).str.replace(r'^(\d{4}-\d{2}-\d{2})T', '${1} ')
+                  .str.replace_all('Z', '+00', literal=True))
+    filled = normalized.str.to_datetime(TIMESTAMP_FORMAT, time_unit='us', time_zone='UTC', strict=False).fill_null(
+        normalized.str.to_datetime(NAIVE_TIMESTAMP_FORMAT, time_unit='us', time_zone='UTC', strict=False))
+    missed = filled.is_null().arg_true()
+    if len(missed):
+        fallback = [to_utc(parse_timestamp(key)) for key in keys.gather(rest.gather(missed))]
+        filled = filled.scatter(missed, pl.Series(fallback, dtype=TIME_DTYPE))
+    return times.scatter(rest, filled)
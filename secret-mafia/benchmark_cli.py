@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Benchmark cold-start time of the mafia CLI
+
+Each measurement is a fresh interpreter: `mafia.py --help`, each subcommand's
+--help (parsing only, except for analyze and visualize, whose help comes from
+the imported script), and the import of each subcommand's script, which is the
+fixed cost paid before it starts working.
+"""
+
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from mafia import COMMANDS
+
+HERE = Path(__file__).resolve().parent
+REPEAT = 5
+
+
+def cold_start(args):
+    """Median wall time of a fresh interpreter running `args`."""
+    times = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, cwd=HERE, check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def main():
+    baseline = cold_start(['-c', 'pass'])
+    print(f"Median of {REPEAT} cold starts; bare interpreter {baseline:.0f} ms\n")
+    print(f"{'command':36s} {'ms':>8s}")
+    print(f"{'mafia --help':36s} {cold_start(['mafia.py', '--help']):8.0f}")
+    for name, (module, _, _) in COMMANDS.items():
+        print(f"{f'mafia {name} --help':36s} {cold_start(['mafia.py', name, '--help']):8.0f}")
+    print()
+    for name, (module, _, _) in COMMANDS.items():
+        print(f"{f'import {module}':36s} {cold_start(['-c', f'import {module}']):8.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark observations decoding: stdlib json.loads against observations.py
+
+The raw JSON values are rebuilt from the turns table, so the benchmark runs
+without downloading the dataset.
+"""
+
+import json
+import time
+import tracemalloc
+
+from mafia_store import load_turns
+from observations import decode_turns, iter_turns
+
+
+def raw_observations():
+    turns = load_turns(columns=['game_id', 'player_id', 'timestamp', 'observation', 'action'])
+    raws = []
+    for _, player_turns in turns.groupby(['game_id', 'player_id'], sort=False):
+        raws.append(json.dumps({
+            timestamp: {'observation': observation, 'action': action}
+            for timestamp, observation, action in zip(player_turns['timestamp'],
+                                                      player_turns['observation'],
+                                                      player_turns['action'])
+        }))
+    return raws
+
+
+def retained_mb(decoder, raws):
+    """MB held by the decoded values of every record."""
+    tracemalloc.start()
+    decoded = [decoder(raw) for raw in raws]
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del decoded
+    return retained / 1024 / 1024
+
+
+def main():
+    print("Rebuilding raw observations from the store...")
+    raws = raw_observations()
+    total_mb = sum(len(raw) for raw in raws) / 1024 / 1024
+    print(f"Records: {len(raws):,} ({total_mb:.1f} MB of JSON)")
+
+    decoders = {
+        'json.loads': json.loads,
+        'decode_turns': decode_turns,
+        'iter_turns': lambda raw: dict(iter_turns(raw)),
+        'first turn': lambda raw: next(iter_turns(raw), None),
+    }
+
+    # Both full decoders must produce the same entries
+    for raw in raws:
+        expected = [(ts, entry['observation'], entry.get('action')) for ts, entry in json.loads(raw).items()]
+        typed = [(ts, turn.observation, turn.action) for ts, turn in decode_turns(raw).items()]
+        if typed != expected or [(ts, t.observation, t.action) for ts, t in iter_turns(raw)] != expected:
+            print("MISMATCH: typed decoding disagrees with json.loads")
+            raise SystemExit(1)
+
+    # Untraced runs for timing, traced runs for memory
+    print(f"\n{'decoder':14s} {'seconds':>9s} {'MB/sec':>9s} {'retained MB':>12s}")
+    for name, decoder in decoders.items():
+        start = time.perf_counter()
+        for raw in raws:
+            decoder(raw)
+        elapsed = time.perf_counter() - start
+        print(f"{name:14s} {elapsed:9.3f} {total_mb / elapsed:9.1f} {retained_mb(decoder, raws):12.1f}")
+
+
+if __name__ == '__main__':
+    main()
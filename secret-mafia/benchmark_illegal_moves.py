@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Benchmark the illegal-move scanner on 1, 2, 4 and 8 worker processes
+"""
+
+import os
+import time
+
+from illegal_moves import scan_illegal_moves
+from mafia_store import load_turns
+
+WORKER_COUNTS = (1, 2, 4, 8)
+
+
+def main():
+    print("Loading turns from the observation store...")
+    turns = load_turns(columns=['game_id', 'player_id', 'observation'])
+    print(f"Turns: {len(turns):,} on a machine with {os.cpu_count()} CPU(s)")
+
+    baseline = None
+    print(f"\n{'workers':>7s} {'seconds':>9s} {'turns/sec':>12s} {'speedup':>8s} {'efficiency':>11s}")
+    for workers in WORKER_COUNTS:
+        start = time.perf_counter()
+        scan = scan_illegal_moves(turns, workers=workers)
+        elapsed = time.perf_counter() - start
+
+        if baseline is None:
+            baseline = (scan, elapsed)
+        elif (scan.positions, scan.reasons, scan.per_player, scan.eliminated) != \
+                (baseline[0].positions, baseline[0].reasons, baseline[0].per_player, baseline[0].eliminated):
+            print(f"MISMATCH: {workers} workers disagree with a serial scan")
+            raise SystemExit(1)
+
+        speedup = baseline[1] / elapsed
+        print(f"{workers:7d} {elapsed:9.3f} {len(turns) / elapsed:12,.0f} {speedup:7.2f}x {speedup / workers:10.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark interned observation storage against the raw observations JSON
+
+Compares in-memory and on-disk (Parquet, zstd) size, and decode throughput of
+every observation string: msgspec decoding of the raw JSON values against the
+vectorized segment join of message_store.py.
+"""
+
+import io
+import time
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from benchmark_decoding import raw_observations
+from message_store import build_interned, decode_observations
+from mafia_store import load_table
+from observations import decode_turns
+
+
+def parquet_mb(*tables):
+    size = 0
+    for table in tables:
+        buffer = io.BytesIO()
+        pq.write_table(table, buffer, compression='zstd')
+        size += buffer.tell()
+    return size / 1024 / 1024
+
+
+def main():
+    print("Rebuilding raw observations from the store...")
+    raws = raw_observations()
+    turns = load_table('turns', columns=['game_id', 'player_id', 'turn', 'timestamp', 'observation'])
+    raw_mb = sum(len(raw.encode('utf-8')) for raw in raws) / 1024 / 1024
+
+    start = time.perf_counter()
+    messages, refs = build_interned(turns)
+    build_seconds = time.perf_counter() - start
+    interned_mb = (messages['text'].nbytes + messages['digest'].nbytes + refs['message_ids'].nbytes) / 1024 / 1024
+
+    start = time.perf_counter()
+    json_observations = [turn.observation for raw in raws for turn in decode_turns(raw).values()]
+    json_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    decoded = decode_observations(messages, refs['message_ids'])
+    interned_seconds = time.perf_counter() - start
+
+    # The turns table keeps each record's observations in their original order
+    if decoded.to_pylist() != json_observations:
+        print("MISMATCH: interned observations differ from the raw JSON")
+        raise SystemExit(1)
+
+    raw_disk_mb = parquet_mb(pa.table({'observations': raws}))
+    interned_disk_mb = parquet_mb(messages, refs.select(['message_ids']))
+
+    print(f"Observations: {len(decoded):,} from {len(raws):,} records, "
+          f"{len(messages):,} distinct segments (interned in {build_seconds:.2f}s)")
+    print(f"\n{'format':14s} {'memory MB':>10s} {'parquet MB':>11s} {'decode s':>9s} {'obs/sec':>11s}")
+    print(f"{'raw JSON':14s} {raw_mb:10.1f} {raw_disk_mb:11.1f} {json_seconds:9.3f} "
+          f"{len(decoded) / json_seconds:11,.0f}")
+    print(f"{'interned':14s} {interned_mb:10.1f} {interned_disk_mb:11.1f} {interned_seconds:9.3f} "
+          f"{len(decoded) / interned_seconds:11,.0f}")
+    print(f"\nCompression: {raw_mb / interned_mb:.1f}x in memory, {raw_disk_mb / interned_disk_mb:.1f}x on disk; "
+          f"decode {json_seconds / interned_seconds:.1f}x faster")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Report peak memory of the Secret Mafia loading paths
+
+Each measurement runs in a fresh interpreter so the peak RSS belongs to that
+path alone:
+
+  legacy  pd.DataFrame(load_dataset(...)['train']), the old loading step
+  store   the memory-mapped column projection detailed_analysis.py now reads
+  script  a full run of detailed_analysis.py (outputs go to a temp dir)
+"""
+
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+
+SNIPPETS = {
+    'legacy': (
+        "from datasets import load_dataset\n"
+        "import pandas as pd\n"
+        "df = pd.DataFrame(load_dataset('bobbycxy/mgc2025-secretmafia')['train'])\n"
+    ),
+    'store': (
+        "from mafia_store import load_records\n"
+        "df = load_records(columns=['game_id', 'player_id', 'model_name', 'num_turns', 'num_observations',\n"
+        "                           'status', 'reason', 'role', 'team', 'won'])\n"
+    ),
+}
+
+
+def peak_rss_mb(args, cwd):
+    """Run a child interpreter and return (exit code, seconds, peak RSS in MB)."""
+    start = time.perf_counter()
+    # getrusage reports the largest child so far, so each measurement needs a fresh parent
+    probe = (
+        "import resource, subprocess, sys\n"
+        "code = subprocess.call(sys.argv[1:], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)\n"
+        "print(code, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)\n"
+    )
+    out = subprocess.run([sys.executable, '-c', probe, *args], cwd=cwd,
+                         capture_output=True, text=True, check=True).stdout.split()
+    elapsed = time.perf_counter() - start
+    code, maxrss = int(out[0]), int(out[1])
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return code, elapsed, maxrss / scale
+
+
+def main():
+    print(f"{'path':8s} {'seconds':>9s} {'peak RSS (MB)':>14s}")
+    with tempfile.TemporaryDirectory() as tmp:
+        runs = {name: [sys.executable, '-c', f"import sys; sys.path.insert(0, {str(HERE)!r})\n{code}"]
+                for name, code in SNIPPETS.items()}
+        runs['script'] = [sys.executable, str(HERE / 'detailed_analysis.py')]
+
+        for name, args in runs.items():
+            code, elapsed, peak = peak_rss_mb(args, tmp)
+            if code != 0:
+                print(f"{name:8s} {'failed (exit ' + str(code) + ')':>24s}")
+                continue
+            print(f"{name:8s} {elapsed:9.2f} {peak:14.1f}")
+
+
+if __name__ == '__main__':
+    main()
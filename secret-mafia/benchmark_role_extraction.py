@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Benchmark role/team extraction: the old iterrows loop against roles.py
+"""
+
+import time
+
+import pandas as pd
+
+from mafia_store import load_turns
+from roles import extract_role_team, extract_roles
+
+
+def legacy_extract(df):
+    """The per-record loop the analysis scripts used before roles.py."""
+    rows = []
+    for idx, row in df.iterrows():
+        first_obs = row['observation']
+        role = None
+        team = None
+        if 'Your role:' in first_obs:
+            role_line = [line for line in first_obs.split('\n') if 'Your role:' in line][0]
+            role = role_line.split('Your role:')[1].strip()
+        if 'Team:' in first_obs:
+            team_line = [line for line in first_obs.split('\n') if 'Team:' in line][0]
+            team = team_line.split('Team:')[1].strip()
+        rows.append((role, team))
+    return pd.DataFrame(rows, columns=['role', 'team'], index=df.index)
+
+
+def compiled_extract(df):
+    rows = [extract_role_team(obs) for obs in df['observation']]
+    return pd.DataFrame(rows, columns=['role', 'team'], index=df.index)
+
+
+def vectorized_extract(df):
+    return extract_roles(df['observation'])
+
+
+def main():
+    print("Loading first observations from the observation store...")
+    first = load_turns(columns=['observation'], filters=[('turn', '==', 1)])
+    print(f"Records: {len(first):,}")
+
+    results = {}
+    timings = {}
+    for name, extractor in (('iterrows', legacy_extract),
+                            ('compiled', compiled_extract),
+                            ('vectorized', vectorized_extract)):
+        start = time.perf_counter()
+        results[name] = extractor(first)
+        timings[name] = time.perf_counter() - start
+
+    expected = results['iterrows'].fillna('').astype(str)
+    for name, result in results.items():
+        if not result.fillna('').astype(str).equals(expected):
+            print(f"MISMATCH: {name} disagrees with the iterrows loop")
+            raise SystemExit(1)
+
+    print(f"\n{'extractor':12s} {'seconds':>10s} {'records/sec':>14s} {'speedup':>9s}")
+    for name, elapsed in timings.items():
+        print(f"{name:12s} {elapsed:10.3f} {len(first) / elapsed:14,.0f} {timings['iterrows'] / elapsed:8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Benchmark every analysis stage on fixed fixtures and gate on regressions
+
+Stages (each one loads its own inputs, so the time covers the whole step):
+
+  ingest         decode raw records into a store, extracting roles and teams
+  roles          the role/team extraction ingest runs on every first observation
+  illegal-moves  the invalid-move scan of analyze_illegal_moves.py
+  aggregation    detailed_analysis.py: win rates, intervals and ratings
+  plotting       rendering every figure of create_visualizations.py
+  ipd-errors     IPD error detection with the lazy parquet scan
+
+Fixtures: `small` (500 synthetic games, 1,000 IPD games), `full` (the real
+store and IPD dataset) and `10x` (50,000 synthetic games, ten times the real
+dump, and 50,000 IPD games). Synthetic fixtures are generated once under
+data/benchmarks/ by synthetic.py and IPD/synthetic.py, and re-ingested when
+the store version changes.
+
+Each stage runs in a fresh interpreter, so its peak RSS is its own; the best
+of --repeat runs is kept. Runs exit with status 1 when a stage is slower or
+larger than the baseline by more than the thresholds:
+
+  python benchmark_suite.py --fixtures small
+  python benchmark_suite.py --fixtures small 10x --threshold 0.2
+
+The baseline is committed as benchmarks/baseline.json, next to this script,
+so the gate works on a fresh checkout. It holds the `small` and `10x`
+fixtures and the host they were measured on (its `machine` entry; a runner
+elsewhere gets a note). Timings depend on the machine: after an intended
+performance change, or to gate on other hardware, refresh it with
+--save-baseline (only the fixtures and stages run are replaced) and commit it:
+
+  python benchmark_suite.py --fixtures small 10x --repeat 2 --save-baseline
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from mgc_common.instrument import peak_rss_mb
+
+HERE = Path(__file__).resolve().parent
+IPD_DIR = HERE.parent / 'IPD'
+BENCHMARK_DIR = HERE / 'data' / 'benchmarks'
+BASELINE = HERE / 'benchmarks' / 'baseline.json'
+
+# Fixture -> (synthetic Secret Mafia games, synthetic IPD games); None is the real data
+FIXTURES = {
+    'small': (500, 1000),
+    'full': (None, None),
+    '10x': (50000, 50000),
+}
+STAGES = ['ingest', 'roles', 'illegal-moves', 'aggregation', 'plotting', 'ipd-errors']
+
+# Differences below these are noise however large they are relatively
+MIN_SECONDS_DELTA = 0.25
+MIN_MB_DELTA = 10
+
+
+# Fixtures
+
+def load_ipd_module(name):
+    """A module of IPD/ loaded by path; IPD/ has its own synthetic.py, so it is never put on sys.path."""
+    spec = importlib.util.spec_from_file_location(f'ipd_{name}', IPD_DIR / f'{name}.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def fixture_dir(fixture):
+    return BENCHMARK_DIR / fixture
+
+
+def fixture_paths(fixture):
+    """(raw games file, store dir, IPD parquet) of a fixture; the real locations for `full`."""
+    if FIXTURES[fixture][0] is None:
+        from mafia_store import STORE_DIR
+
+        return None, STORE_DIR, os.environ.get('IPD_DATA_PATH', load_ipd_module('detect_errors').DATA_PATH)
+    root = fixture_dir(fixture)
+    return root / 'raw.arrow', root / 'store', root / 'ipd.parquet'
+
+
+def prepare_fixture(fixture):
+    """Generate a synthetic fixture once; later runs reuse it."""
+    mafia_games, ipd_games = FIXTURES[fixture]
+    if mafia_games is None:
+        return
+    raw, store, ipd = fixture_paths(fixture)
+
+    import synthetic
+    from mafia_store import STORE_VERSION, ingest, read_manifest
+
+    if not raw.exists():
+        print(f"Generating the {fixture} fixture: {mafia_games:,} Secret Mafia games...")
+        synthetic.write_raw(synthetic.parse_args(['--games', str(mafia_games)]), raw)
+    # A store of an older version would otherwise be rebuilt from the real dataset by the loaders
+    manifest = read_manifest(store)
+    if manifest is None or manifest.get('version') != STORE_VERSION:
+        print(f"Ingesting the {fixture} fixture into its store...")
+        with contextlib.redirect_stdout(open(os.devnull, 'w')):
+            ingest(synthetic.load_raw(raw), store_dir=store)
+
+    if not ipd.exists():
+        print(f"Generating the {fixture} fixture: {ipd_games:,} IPD games...")
+        subprocess.run([sys.executable, str(IPD_DIR / 'synthetic.py'), '--games', str(ipd_games),
+                        '--output', str(ipd)], check=True, stdout=subprocess.DEVNULL)
+
+
+# Stages, run inside the child interpreter
+
+def stage_ingest(raw, store, ipd):
+    import tempfile
+
+    import synthetic
+    from mafia_store import ingest
+
+    with tempfile.TemporaryDirectory() as tmp:
+        return ingest(None if raw is None else synthetic.load_raw(raw), store_dir=tmp)
+
+
+def stage_roles(raw, store, ipd):
+    from mafia_store import load_turns
+    from roles import extract_role_team
+
+    # One call per record, as mafia_store.normalize_records makes them
+    first = load_turns(columns=['observation'], filters=[('turn', '==', 1)])
+    return len([extract_role_team(observation) for observation in first['observation']])
+
+
+def stage_illegal_moves(raw, store, ipd):
+    from illegal_moves import scan_illegal_moves
+    from mafia_store import load_turns
+
+    turns = load_turns(columns=['game_id', 'player_id', 'observation'])
+    scan_illegal_moves(turns)
+    return len(turns)
+
+
+def stage_aggregation(raw, store, ipd):
+    from detailed_analysis import full_analysis
+    from mafia_store import read_manifest
+
+    full_analysis()
+    return read_manifest(store)['records']
+
+
+def stage_plotting(raw, store, ipd):
+    from create_visualizations import FIGURES, render
+
+    for output, (function, _) in FIGURES.items():
+        render(output, function)
+    return len(FIGURES)
+
+
+def stage_ipd_errors(raw, store, ipd):
+    return len(load_ipd_module('detect_errors').scan_player_errors(str(ipd)))
+
+
+STAGE_FUNCTIONS = {
+    'ingest': stage_ingest,
+    'roles': stage_roles,
+    'illegal-moves': stage_illegal_moves,
+    'aggregation': stage_aggregation,
+    'plotting': stage_plotting,
+    'ipd-errors': stage_ipd_errors,
+}
+
+
+def run_stage(stage, fixture):
+    """Child side: run one stage with the fixture's store and print its measurements as JSON."""
+    raw, store, ipd = fixture_paths(fixture)
+    work = fixture_dir(fixture) / 'work'
+    work.mkdir(parents=True, exist_ok=True)
+    os.chdir(work)      # the scripts read and write their CSVs and figures in the working directory
+
+    if stage == 'plotting' and not Path('model_performance_corrected.csv').exists():
+        with contextlib.redirect_stdout(open(os.devnull, 'w')):
+            stage_aggregation(raw, store, ipd)
+
+    with contextlib.redirect_stdout(open(os.devnull, 'w')):
+        start = time.perf_counter()
+        items = STAGE_FUNCTIONS[stage](raw, store, ipd)
+        elapsed = time.perf_counter() - start
+    print(json.dumps({'seconds': elapsed, 'peak_mb': peak_rss_mb(), 'items': items}))
+
+
+# Parent side
+
+def measure(stage, fixture, repeat):
+    """Best time and peak memory of `repeat` fresh-interpreter runs of a stage."""
+    _, store, _ = fixture_paths(fixture)
+    env = dict(os.environ, MAFIA_STORE_DIR=str(store))
+    runs = []
+    for _ in range(repeat):
+        child = subprocess.run([sys.executable, str(HERE / 'benchmark_suite.py'), '--run', stage, '--fixture', fixture],
+                               env=env, capture_output=True, text=True)
+        if child.returncode != 0:
+            return {'error': child.stderr.strip().splitlines()[-1] if child.stderr.strip() else 'failed'}
+        runs.append(json.loads(child.stdout.strip().splitlines()[-1]))
+    return {
+        'seconds': min(run['seconds'] for run in runs),
+        'peak_mb': min(run['peak_mb'] for run in runs),
+        'items': runs[0]['items'],
+    }
+
+
+def regressions(results, baseline, threshold, memory_threshold):
+    """Messages for every stage slower or larger than its baseline beyond the thresholds."""
+    found = []
+    for key, result in results.items():
+        base = baseline.get('results', {}).get(key)
+        if 'error' in result:
+            found.append(f"{key}: failed ({result['error']})")
+            continue
+        if base is None or 'error' in base:
+            continue
+        if result['seconds'] > base['seconds'] * (1 + threshold) and \
+                result['seconds'] - base['seconds'] > MIN_SECONDS_DELTA:
+            found.append(f"{key}: {result['seconds']:.2f}s vs baseline {base['seconds']:.2f}s "
+                         f"(+{result['seconds'] / base['seconds'] - 1:.0%})")
+        if result['peak_mb'] > base['peak_mb'] * (1 + memory_threshold) and \
+                result['peak_mb'] - base['peak_mb'] > MIN_MB_DELTA:
+            found.append(f"{key}: peak {result['peak_mb']:.0f} MB vs baseline {base['peak_mb']:.0f} MB "
+                         f"(+{result['peak_mb'] / base['peak_mb'] - 1:.0%})")
+    return found
+
+
+def machine():
+    """The host a run was measured on, saved with the baseline."""
+    info = {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count()}
+    cpuinfo, meminfo = Path('/proc/cpuinfo'), Path('/proc/meminfo')
+    if cpuinfo.exists():
+        info['processor'] = next((line.split(':', 1)[1].strip() for line in cpuinfo.read_text().splitlines()
+                                  if line.startswith('model name')), platform.processor())
+    if meminfo.exists():
+        info['memory_gb'] = round(int(meminfo.read_text().split()[1]) / 2**20, 1)
+    return info
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every analysis stage and gate on regressions")
+    parser.add_argument('--fixtures', nargs='+', choices=list(FIXTURES), default=['small'])
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES)
+    parser.add_argument('--repeat', type=int, default=3, help='fresh runs per stage, the best is kept')
+    parser.add_argument('--baseline', default=str(BASELINE), help='baseline JSON to compare with or save to')
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the baseline')
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed relative slowdown')
+    parser.add_argument('--memory-threshold', type=float, default=0.25, help='allowed relative peak RSS growth')
+    parser.add_argument('--json', default=None, help='also write the results to this file')
+    parser.add_argument('--run', choices=STAGES, help=argparse.SUPPRESS)
+    parser.add_argument('--fixture', choices=list(FIXTURES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_stage(args.run, args.fixture)
+        return
+
+    baseline_path = Path(args.baseline)
+    baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else {}
+    if baseline and baseline.get('machine', {}).get('platform') != platform.platform() and not args.save_baseline:
+        print(f"Note: the baseline was recorded on {baseline['machine'].get('platform')} "
+              f"({baseline['machine'].get('cpus')} CPUs); refresh it with --save-baseline on this machine\n")
+
+    results = {}
+    print(f"{'fixture/stage':28s} {'seconds':>9s} {'peak MB':>9s} {'baseline s':>11s} {'baseline MB':>12s}")
+    for fixture in args.fixtures:
+        prepare_fixture(fixture)
+        for stage in args.stages:
+            key = f'{fixture}/{stage}'
+            results[key] = result = measure(stage, fixture, args.repeat)
+            base = baseline.get('results', {}).get(key, {})
+            if 'error' in result:
+                print(f"{key:28s} failed: {result['error']}")
+                continue
+            base_seconds = f"{base['seconds']:.3f}" if 'seconds' in base else '-'
+            base_mb = f"{base['peak_mb']:.0f}" if 'peak_mb' in base else '-'
+            print(f"{key:28s} {result['seconds']:9.3f} {result['peak_mb']:9.0f} {base_seconds:>11s} {base_mb:>12s}")
+
+    report = {'machine': machine(), 'results': results}
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+
+    if args.save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        merged = dict(baseline.get('results', {}), **{k: v for k, v in results.items() if 'error' not in v})
+        baseline_path.write_text(json.dumps(dict(report, results=merged), indent=2))
+        print(f"\nSaved the baseline to {baseline_path}")
+        return
+
+    found = regressions(results, baseline, args.threshold, args.memory_threshold)
+    if found:
+        print(f"\nREGRESSION against {baseline_path}:")
+        for message in found:
+            print(f"  {message}")
+        raise SystemExit(1)
+    print("\nNo regressions" + ("" if baseline else f" (no baseline at {baseline_path} yet, use --save-baseline)"))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Benchmark text_index.py lookups against a linear scan of the turns table
+
+The scan is what analyze_illegal_moves.py does today: run the pattern over
+every observation string in Python. Each query is answered both ways, and the
+matching (game_id, player_id, timestamp) keys must agree.
+"""
+
+import re
+import time
+
+import text_index
+from mafia_store import load_turns
+
+# (FTS5 query, equivalent regex for the scan); FTS5 matches whole tokens, so the
+# scan's 'invalid' is anchored on word boundaries unlike illegal_moves.INVALID_RE
+QUERIES = [
+    ('invalid', re.compile(r'\binvalid\b', re.IGNORECASE)),
+    ('"attempted an invalid move"', re.compile(r'\battempted an invalid move\b', re.IGNORECASE)),
+    ('"eliminated by making an invalid move"', re.compile(r'\beliminated by making an invalid move\b', re.IGNORECASE)),
+    ('"Vote not in valid format"', re.compile(r'\bVote not in valid format\b', re.IGNORECASE)),
+    ('"was killed during the night"', re.compile(r'\bwas killed during the night\b', re.IGNORECASE)),
+]
+FIRST_N = 20
+
+
+def linear_scan(turns, pattern):
+    return {key for key, observation in zip(turns['key'], turns['observation']) if pattern.search(observation)}
+
+
+def main():
+    print("Loading turns from the observation store...")
+    turns = load_turns(columns=['game_id', 'player_id', 'timestamp', 'observation'])
+    turns['key'] = list(zip(turns['game_id'], turns['player_id'], turns['timestamp']))
+    connection = text_index.connect()
+    print(f"Turns: {len(turns):,}")
+
+    print(f"\n{'query':42s} {'matches':>8s} {'scan ms':>9s} {'index ms':>9s} {f'first {FIRST_N} ms':>12s} {'speedup':>8s}")
+    for query, pattern in QUERIES:
+        start = time.perf_counter()
+        expected = linear_scan(turns, pattern)
+        scan_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        found = {(game_id, player_id, timestamp)
+                 for _, game_id, player_id, timestamp in text_index.keys(connection, query, source='secret-mafia')}
+        index_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        text_index.search(connection, query, limit=FIRST_N, source='secret-mafia')
+        first_ms = (time.perf_counter() - start) * 1000
+
+        if found != expected:
+            print(f"MISMATCH on {query}: index found {len(found):,}, scan found {len(expected):,}")
+            raise SystemExit(1)
+
+        print(f"{query[:42]:42s} {len(found):8,} {scan_ms:9.1f} {index_ms:9.1f} {first_ms:12.2f} {scan_ms / index_ms:7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,169 +1,224 @@
 #!/usr/bin/env python3
 """
 Detailed analysis of Secret Mafia results to understand win conditions
+
+Run with --incremental to fold only games added since the last run into
+game_results_with_roles.csv and model_performance_corrected.csv, keyed on the
+highest player_game_id already written; --source ingests raw games written by
+synthetic.py instead of the Hugging Face dataset. Both modes refit the
+team-aware ratings in model_ratings.csv.
 """
 
-from datasets import load_dataset
+import argparse
+import os
+
 import pandas as pd
-import json
-
-print("Loading dataset...")
-dataset = load_dataset("bobbycxy/mgc2025-secretmafia")
-df = pd.DataFrame(dataset['train'])
-
-print("\n" + "="*60)
-print("UNDERSTANDING WIN CONDITIONS")
-print("="*60)
-
-# Check unique statuses and reasons
-print("\nUnique status values:")
-print(df['status'].unique())
-
-print("\nUnique reason values:")
-print(df['reason'].unique())
-
-# The dataset has 27,796 records from 4,999 games
-# Each game has 6 players, so we should see ~6 records per game
-print(f"\nRecords per game: {len(df) / df['game_id'].nunique():.2f}")
-
-# Let's look at a complete game to understand the structure
-sample_game_id = df['game_id'].iloc[0]
-sample_game = df[df['game_id'] == sample_game_id].sort_values('player_id')
-
-print(f"\n{'='*60}")
-print(f"SAMPLE GAME #{sample_game_id}")
-print(f"{'='*60}")
-
-for idx, row in sample_game.iterrows():
-    print(f"\nPlayer {row['player_id']} ({row['model_name']}):")
-    print(f"  Status: {row['status']}")
-    print(f"  Reason: {row['reason']}")
-    print(f"  Num turns: {row['num_turns']}")
-
-    # Parse observation to see role
-    try:
-        obs = json.loads(row['observations'])
-        first_obs_key = list(obs.keys())[0]
-        first_obs = obs[first_obs_key]['observation']
-
-        # Extract role from observation
-        if 'Your role:' in first_obs:
-            role_line = [line for line in first_obs.split('\n') if 'Your role:' in line][0]
-            print(f"  Role: {role_line.split('Your role:')[1].strip()}")
-    except:
-        pass
-
-# Analyze win conditions by reason
-print(f"\n{'='*60}")
-print("WIN ANALYSIS BY REASON")
-print(f"{'='*60}")
-
-mafia_wins = df[df['reason'] == 'Mafia reached parity with villagers. Mafia wins!']
-village_wins = df[df['reason'] == 'All Mafia were eliminated. Village wins!']
-
-print(f"\nMafia win records: {len(mafia_wins):,}")
-print(f"Village win records: {len(village_wins):,}")
-
-# Check if we need to look at roles to determine individual winners
-print(f"\n{'='*60}")
-print("CHECKING ROLES IN OBSERVATIONS")
-print(f"{'='*60}")
-
-# Sample 100 random records and extract roles
-sample_roles = []
-for idx, row in df.sample(min(100, len(df))).iterrows():
-    try:
-        obs = json.loads(row['observations'])
-        first_obs_key = list(obs.keys())[0]
-        first_obs = obs[first_obs_key]['observation']
-
-        if 'Your role:' in first_obs:
-            role_line = [line for line in first_obs.split('\n') if 'Your role:' in line][0]
-            role = role_line.split('Your role:')[1].strip()
-            team_line = [line for line in first_obs.split('\n') if 'Team:' in line][0]
-            team = team_line.split('Team:')[1].strip()
-            sample_roles.append((role, team, row['reason']))
-    except:
-        pass
-
-print("\nSample of roles and outcomes:")
-role_df = pd.DataFrame(sample_roles, columns=['Role', 'Team', 'Outcome'])
-print(role_df.groupby(['Team', 'Outcome']).size())
-
-# Calculate actual win rates based on team alignment
-print(f"\n{'='*60}")
-print("RECALCULATING WIN RATES WITH TEAM ALIGNMENT")
-print(f"{'='*60}")
-
-# Extract role and team for all records (this may take a moment)
-print("Extracting roles and teams from all records...")
-roles_data = []
-
-for idx, row in df.iterrows():
-    if idx % 5000 == 0:
-        print(f"  Processing record {idx:,}/{len(df):,}...")
-
-    try:
-        obs = json.loads(row['observations'])
-        first_obs_key = list(obs.keys())[0]
-        first_obs = obs[first_obs_key]['observation']
-
-        role = None
-        team = None
-
-        if 'Your role:' in first_obs:
-            role_line = [line for line in first_obs.split('\n') if 'Your role:' in line][0]
-            role = role_line.split('Your role:')[1].strip()
-
-        if 'Team:' in first_obs:
-            team_line = [line for line in first_obs.split('\n') if 'Team:' in line][0]
-            team = team_line.split('Team:')[1].strip()
-
-        # Determine if this player won
-        won = False
-        if team == 'Mafia' and 'Mafia wins' in row['reason']:
-            won = True
-        elif team == 'Village' and 'Village wins' in row['reason']:
-            won = True
-
-        roles_data.append({
-            'game_id': row['game_id'],
-            'player_id': row['player_id'],
-            'model_name': row['model_name'],
-            'role': role,
-            'team': team,
-            'outcome': row['reason'],
-            'won': won,
-            'num_turns': row['num_turns']
-        })
-    except Exception as e:
-        pass
-
-roles_df = pd.DataFrame(roles_data)
-
-# Calculate corrected win rates
-print(f"\n{'='*60}")
-print("MODEL WIN RATES (WITH TEAM ALIGNMENT)")
-print(f"{'='*60}")
-
-model_perf = roles_df.groupby('model_name').agg({
-    'game_id': 'count',
-    'won': 'sum',
-    'num_turns': 'mean'
-}).rename(columns={'game_id': 'total_games', 'won': 'wins', 'num_turns': 'avg_turns'})
-
-model_perf['win_rate'] = model_perf['wins'] / model_perf['total_games']
-model_perf = model_perf.sort_values('win_rate', ascending=False)
-
-print("\nTop 20 models by win rate:")
-print(model_perf.head(20).to_string())
-
-# Save corrected results
-model_perf.to_csv('model_performance_corrected.csv')
-roles_df.to_csv('game_results_with_roles.csv', index=False)
-
-print(f"\n{'='*60}")
-print("SAVED FILES")
-print(f"{'='*60}")
-print("  - model_performance_corrected.csv")
-print("  - game_results_with_roles.csv")
+
+from mgc_common.instrument import span, traced
+from mafia_store import ingest, load_records
+from model_stats import ModelStats
+from ratings import RATINGS_CSV, Ratings
+from record_index import RecordIndex
+from uncertainty import with_intervals
+
+ROLES_CSV = 'game_results_with_roles.csv'
+PERFORMANCE_CSV = 'model_performance_corrected.csv'
+
+RECORD_COLUMNS = ['player_game_id', 'game_id', 'player_id', 'model_name', 'num_turns', 'num_observations',
+                  'status', 'reason', 'role', 'team', 'won']
+ROLES_COLUMNS = ['player_game_id', 'game_id', 'player_id', 'model_name', 'role', 'team', 'outcome', 'won',
+                 'num_turns']
+
+
+def roles_table(df):
+    # Role, team and win flag were extracted for all records at ingest; records
+    # without any observation have nothing to extract from and are left out
+    return df[df['num_observations'] > 0].rename(columns={'reason': 'outcome'})[ROLES_COLUMNS]
+
+
+def full_analysis():
+    print("Loading records from the observation store...")
+    df = load_records(columns=RECORD_COLUMNS)
+
+    print("\n" + "="*60)
+    print("UNDERSTANDING WIN CONDITIONS")
+    print("="*60)
+
+    # Check unique statuses and reasons
+    print("\nUnique status values:")
+    print(df['status'].unique())
+
+    print("\nUnique reason values:")
+    print(df['reason'].unique())
+
+    # The dataset has 27,796 records from 4,999 games
+    # Each game has 6 players, so we should see ~6 records per game
+    print(f"\nRecords per game: {len(df) / df['game_id'].nunique():.2f}")
+
+    # Let's look at a complete game to understand the structure
+    sample_game_id = df['game_id'].iloc[0]
+    sample_game = RecordIndex(df).game(sample_game_id)
+
+    print(f"\n{'='*60}")
+    print(f"SAMPLE GAME #{sample_game_id}")
+    print(f"{'='*60}")
+
+    for idx, row in sample_game.iterrows():
+        print(f"\nPlayer {row['player_id']} ({row['model_name']}):")
+        print(f"  Status: {row['status']}")
+        print(f"  Reason: {row['reason']}")
+        print(f"  Num turns: {row['num_turns']}")
+
+        # Role was extracted from the first observation at ingest
+        if pd.notna(row['role']):
+            print(f"  Role: {row['role']}")
+
+    # Analyze win conditions by reason
+    print(f"\n{'='*60}")
+    print("WIN ANALYSIS BY REASON")
+    print(f"{'='*60}")
+
+    mafia_wins = df[df['reason'] == 'Mafia reached parity with villagers. Mafia wins!']
+    village_wins = df[df['reason'] == 'All Mafia were eliminated. Village wins!']
+
+    print(f"\nMafia win records: {len(mafia_wins):,}")
+    print(f"Village win records: {len(village_wins):,}")
+
+    # Check if we need to look at roles to determine individual winners
+    print(f"\n{'='*60}")
+    print("CHECKING ROLES IN OBSERVATIONS")
+    print(f"{'='*60}")
+
+    # Sample 100 random records and look at their roles
+    sample = df.sample(min(100, len(df)))
+    sample = sample[sample['role'].notna() & sample['team'].notna()]
+
+    print("\nSample of roles and outcomes:")
+    role_df = pd.DataFrame({'Role': sample['role'], 'Team': sample['team'], 'Outcome': sample['reason']})
+    print(role_df.groupby(['Team', 'Outcome']).size())
+
+    # Calculate actual win rates based on team alignment
+    print(f"\n{'='*60}")
+    print("RECALCULATING WIN RATES WITH TEAM ALIGNMENT")
+    print(f"{'='*60}")
+
+    with span('analysis.roles_table', rows=len(df)):
+        roles_df = roles_table(df)
+
+    # Calculate corrected win rates
+    print(f"\n{'='*60}")
+    print("MODEL WIN RATES (WITH TEAM ALIGNMENT)")
+    print(f"{'='*60}")
+
+    # Wilson and game-clustered bootstrap 95% intervals alongside each win rate
+    with span('analysis.model_stats', rows=len(roles_df)):
+        model_perf = ModelStats().update(roles_df).to_frame()
+    with span('analysis.intervals', rows=len(roles_df)):
+        model_perf = with_intervals(model_perf, roles_df)
+
+    print("\nTop 20 models by win rate:")
+    print(model_perf.head(20).to_string())
+
+    # Ratings adjust win rates for the team dealt and the opponents faced
+    with span('analysis.ratings', rows=len(df)):
+        rated = Ratings.from_records(df)
+        ratings = rated.to_frame()
+    report_fit(rated)
+    print(f"\nTop 20 models by team-aware rating:")
+    print(ratings.head(20).to_string())
+
+    # Save corrected results; ROLES_CSV carries the high-water mark, so it is written last
+    with span('analysis.write_csv', rows=len(model_perf) + len(roles_df) + len(ratings)):
+        replace_csv(model_perf, PERFORMANCE_CSV)
+        replace_csv(ratings, RATINGS_CSV)
+        replace_csv(roles_df, ROLES_CSV, index=False)
+
+    print(f"\n{'='*60}")
+    print("SAVED FILES")
+    print(f"{'='*60}")
+    print(f"  - {PERFORMANCE_CSV}")
+    print(f"  - {ROLES_CSV}")
+    print(f"  - {RATINGS_CSV}")
+
+
+def report_fit(rated):
+    if not rated.converged:
+        print(f"\nWarning: the rating fit did not converge ({rated.fit_message}); "
+              f"{RATINGS_CSV} holds its last iterate")
+
+
+def replace_csv(frame, path, **kwargs):
+    """Write a CSV through a temporary file, so an interrupted write never leaves half of one."""
+    temporary = f'{path}.tmp'
+    frame.to_csv(temporary, **kwargs)
+    os.replace(temporary, path)
+
+
+def incremental_update(source=None):
+    ingest(source, incremental=True)
+
+    # Outputs written before player_game_id was recorded have no high-water mark
+    if not (os.path.exists(ROLES_CSV) and os.path.exists(PERFORMANCE_CSV)) or \
+            'player_game_id' not in pd.read_csv(ROLES_CSV, nrows=0).columns:
+        print("No previous outputs with a player_game_id high-water mark, running the full analysis...")
+        full_analysis()
+        return
+
+    written = pd.read_csv(ROLES_CSV, usecols=['player_game_id'])['player_game_id']
+    stats = ModelStats.from_performance(pd.read_csv(PERFORMANCE_CSV, index_col='model_name'))
+    # Every roles row is one game of the performance table; a run stopped between the two writes breaks that
+    if stats.state['total_games'].sum() != len(written):
+        print(f"{PERFORMANCE_CSV} and {ROLES_CSV} disagree (an earlier run was interrupted), "
+              f"running the full analysis...")
+        full_analysis()
+        return
+
+    high_water_mark = written.max()
+    new_roles = roles_table(load_records(columns=RECORD_COLUMNS,
+                                         filters=[('player_game_id', '>', high_water_mark)]))
+    if new_roles.empty:
+        print(f"No games above player_game_id {high_water_mark:,}, outputs are up to date")
+        return
+
+    model_perf = with_intervals(stats.update(new_roles).to_frame())
+
+    # A full refit takes well under a second; the previous ratings only warm-start it
+    previous = pd.read_csv(RATINGS_CSV, index_col='model_name') if os.path.exists(RATINGS_CSV) else None
+    rated = Ratings.from_records(load_records(columns=RECORD_COLUMNS), previous=previous)
+    report_fit(rated)
+    ratings = rated.to_frame()
+
+    # Everything is computed before anything is written, and the roles are appended last since
+    # they advance the high-water mark; a run stopped in between is caught by the check above
+    replace_csv(model_perf, PERFORMANCE_CSV)
+    replace_csv(ratings, RATINGS_CSV)
+    new_roles.to_csv(ROLES_CSV, mode='a', header=False, index=False)
+
+    print(f"Added {len(new_roles):,} records from {new_roles['game_id'].nunique():,} new games")
+    print(f"  - {PERFORMANCE_CSV}: {len(model_perf):,} models")
+    print(f"  - {ROLES_CSV}: high-water mark now {new_roles['player_game_id'].max():,}")
+    print(f"  - {RATINGS_CSV}: {len(ratings):,} models rated")
+
+
+@traced('detailed_analysis')
+def main():
+    parser = argparse.ArgumentParser(description="Detailed analysis of Secret Mafia results")
+    parser.add_argument('--incremental', action='store_true',
+                        help='only process games added since the last run')
+    parser.add_argument('--source', default=None,
+                        help='with --incremental, ingest raw games from this Arrow file (as written by '
+                             'synthetic.py) instead of the Hugging Face dataset')
+    args = parser.parse_args()
+
+    if args.incremental:
+        source = None
+        if args.source:
+            from synthetic import load_raw
+            source = load_raw(args.source)
+        incremental_update(source)
+    else:
+        full_analysis()
+
+
+if __name__ == '__main__':
+    main()
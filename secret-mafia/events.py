@@ -0,0 +1,177 @@
+"""
+Structured game events parsed from observations
+
+Every observation is a transcript of bracketed messages: `[-1] ...` from the
+moderator and `[N] ...` from player N, with continuation lines belonging to
+the preceding message. The parser turns each message into typed events and
+stores them as one compact columnar table under data/events.parquet, rebuilt
+whenever the store has changed since it was written:
+
+  game_id, observer, turn   which observation the event was read from
+  seq                       position of the message inside that observation
+  event_type                integer code, see EVENT_TYPES
+  actor, target             player ids (-1 for the moderator / no target)
+  value                     event payload, see below
+  message                   the message text (categorical)
+
+Payloads: DETECTIVE_RESULT is 1 if the target IS a Mafia member, ELIMINATION
+is 1 if the player was removed for an invalid move rather than by vote.
+
+The same public message reaches every observer, so `distinct_events`
+collapses the per-observer copies before counting game-level events.
+"""
+
+import re
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from mafia_store import STORE_DIR, is_current, load_turns, write_derived
+
+EVENTS_PATH = STORE_DIR / 'events.parquet'
+
+EVENT_TYPES = ('NIGHT_KILL', 'DOCTOR_SAVE', 'DETECTIVE_RESULT', 'CHAT_MESSAGE',
+               'VOTE_CAST', 'ELIMINATION', 'INVALID_MOVE')
+NIGHT_KILL, DOCTOR_SAVE, DETECTIVE_RESULT, CHAT_MESSAGE, VOTE_CAST, ELIMINATION, INVALID_MOVE = range(len(EVENT_TYPES))
+
+MODERATOR = -1
+NO_PLAYER = -1
+
+MESSAGE_RE = re.compile(r'^\[(-?\d+)\]', re.MULTILINE)
+
+# Moderator announcements; every pattern is matched, as one announcement can report several events
+MODERATOR_PATTERNS = [
+    (re.compile(r'Player (\d+) was killed during the night'), NIGHT_KILL, 0),
+    (re.compile(r'No one was killed tonight'), DOCTOR_SAVE, 0),
+    (re.compile(r'Player (\d+) IS NOT a Mafia member'), DETECTIVE_RESULT, 0),
+    (re.compile(r'Player (\d+) IS a Mafia member'), DETECTIVE_RESULT, 1),
+    (re.compile(r'Player (\d+) has been eliminated by making an invalid move'), ELIMINATION, 1),
+    (re.compile(r'Player (\d+) was eliminated'), ELIMINATION, 0),
+    (re.compile(r'Player (\d+) attempted an invalid move'), INVALID_MOVE, 0),
+]
+
+# A player's vote, either "VOTE: Player 3" or a bare "[3]" as the whole message
+VOTE_RE = re.compile(r'VOTE:?\**\s*\[?Player\s*(\d+)', re.IGNORECASE)
+BARE_VOTE_RE = re.compile(r'^\s*\[(\d+)\]\s*\]?\s*$')
+
+EVENT_COLUMNS = {
+    'game_id': np.int64,
+    'observer': np.int8,
+    'turn': np.int16,
+    'seq': np.int16,
+    'event_type': np.int8,
+    'actor': np.int8,
+    'target': np.int8,
+    'value': np.int8,
+}
+
+
+def split_messages(text):
+    """Yield (speaker, body) for every bracketed message of an observation."""
+    starts = list(MESSAGE_RE.finditer(text))
+    for i, match in enumerate(starts):
+        end = starts[i + 1].start() if i + 1 < len(starts) else len(text)
+        yield int(match.group(1)), text[match.end():end].strip()
+
+
+def parse_observation(text):
+    """Typed events of one observation as (seq, event_type, actor, target, value, message) tuples."""
+    events = []
+    for seq, (speaker, body) in enumerate(split_messages(text or '')):
+        if speaker == MODERATOR:
+            for pattern, event_type, value in MODERATOR_PATTERNS:
+                for match in pattern.finditer(body):
+                    target = int(match.group(1)) if pattern.groups else NO_PLAYER
+                    events.append((seq, event_type, MODERATOR, target, value, match.group(0)))
+            continue
+
+        events.append((seq, CHAT_MESSAGE, speaker, NO_PLAYER, 0, body))
+        vote = VOTE_RE.search(body) or BARE_VOTE_RE.match(body)
+        if vote:
+            events.append((seq, VOTE_CAST, speaker, int(vote.group(1)), 0, body))
+    return events
+
+
+def build_events(turns):
+    """Parse every observation of a turns frame into the columnar event table."""
+    columns = {name: [] for name in list(EVENT_COLUMNS) + ['message']}
+    for game_id, observer, turn, observation in zip(turns['game_id'], turns['player_id'],
+                                                    turns['turn'], turns['observation']):
+        for seq, event_type, actor, target, value, message in parse_observation(observation):
+            columns['game_id'].append(game_id)
+            columns['observer'].append(observer)
+            columns['turn'].append(turn)
+            columns['seq'].append(seq)
+            columns['event_type'].append(event_type)
+            columns['actor'].append(actor)
+            columns['target'].append(target)
+            columns['value'].append(value)
+            columns['message'].append(message)
+
+    events = pd.DataFrame({name: np.asarray(columns[name], dtype=dtype) for name, dtype in EVENT_COLUMNS.items()})
+    events['message'] = pd.Categorical(columns['message'])
+    return events
+
+
+def save_events(events, path=EVENTS_PATH, store_dir=STORE_DIR):
+    write_derived(pa.Table.from_pandas(events, preserve_index=False), path, store_dir)
+
+
+def load_events(columns=None, path=EVENTS_PATH, rebuild=False, store_dir=STORE_DIR):
+    """The event table, parsed from the turns table and saved whenever the store has changed."""
+    path = Path(path)
+    if rebuild or not is_current(path, store_dir):
+        print("Parsing observations into the event table...")
+        turns = load_turns(columns=['game_id', 'player_id', 'turn', 'observation'], store_dir=store_dir)
+        save_events(build_events(turns), path, store_dir)
+    return pq.read_table(path, columns=columns, memory_map=True).to_pandas()
+
+
+def distinct_events(events):
+    """Game-level events: each observer's copy of a public message counted once.
+
+    An event repeated n times within one observer's observations (the same
+    chat line re-quoted, a player voting twice) still counts n times.
+    """
+    keys = ['game_id', 'event_type', 'actor', 'target', 'value', 'message']
+    copies = events.groupby(['observer'] + keys, observed=True).size()
+    counts = copies.groupby(level=keys, observed=True).max()
+    return counts.index.to_frame(index=False).loc[lambda df: df.index.repeat(counts.to_numpy())].reset_index(drop=True)
+
+
+def event_name(codes):
+    """Map integer event codes to their names."""
+    return pd.Categorical.from_codes(codes, categories=list(EVENT_TYPES))
+
+
+def votes_against_mafia(events, records):
+    """Share of each team's votes that target a Mafia member, as one vectorized join."""
+    votes = distinct_events(events[events['event_type'] == VOTE_CAST])
+    teams = records[['game_id', 'player_id', 'team']].astype({'player_id': np.int8})
+    votes = votes.merge(teams.rename(columns={'player_id': 'actor', 'team': 'voter_team'}), on=['game_id', 'actor']) \
+                 .merge(teams.rename(columns={'player_id': 'target', 'team': 'target_team'}), on=['game_id', 'target'])
+    votes['on_mafia'] = votes['target_team'] == 'Mafia'
+    return votes.groupby('voter_team')['on_mafia'].agg(votes='size', share_on_mafia='mean')
+
+
+if __name__ == '__main__':
+    from mafia_store import load_records
+
+    start = time.perf_counter()
+    events = load_events(rebuild='--rebuild' in sys.argv[1:])
+    elapsed = time.perf_counter() - start
+    print(f"Loaded {len(events):,} events in {elapsed:.2f}s "
+          f"({events.memory_usage(deep=True).sum() / 1e6:.1f} MB in memory)")
+
+    print("\nEvents by type (distinct per game):")
+    counts = distinct_events(events).groupby('event_type').size()
+    for code, count in counts.items():
+        print(f"  {EVENT_TYPES[code]:<17} {count:>10,}")
+
+    print("\nVotes by voter team:")
+    print(votes_against_mafia(events, load_records(columns=['game_id', 'player_id', 'team'])).to_string())
@@ -0,0 +1,86 @@
+"""
+Chunked, multi-process scan of the turns table for illegal moves
+
+An observation is flagged when it mentions "invalid" in any case; the
+moderator's "attempted an invalid move" notice is one such mention. Each
+worker scans a chunk of observations with one compiled case-insensitive
+pattern and returns partial tallies, which are merged exactly in chunk order.
+"""
+
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import re
+
+INVALID_RE = re.compile(r'invalid', re.IGNORECASE)
+REASON_RE = re.compile(r'Reason: ([^\n\.]+)')
+ELIMINATED_TEXT = 'eliminated by making an invalid move'
+
+CHUNK_SIZE = 20000
+
+
+def extract_reason(observation):
+    """The stated reason of an invalid-move notice, or None."""
+    match = REASON_RE.search(observation)
+    return match.group(1).strip() if match else None
+
+
+class IllegalMoveScan:
+    """Mergeable result of scanning turns for illegal moves."""
+
+    def __init__(self):
+        self.positions = []             # row positions of flagged observations, in order
+        self.reasons = Counter()        # reason -> flagged observations
+        self.per_player = Counter()     # (game_id, player_id) -> flagged observations
+        self.eliminated = set()         # (game_id, player_id) eliminated for an invalid move
+
+    def merge(self, other):
+        self.positions.extend(other.positions)
+        self.reasons.update(other.reasons)
+        self.per_player.update(other.per_player)
+        self.eliminated.update(other.eliminated)
+        return self
+
+
+def scan_chunk(offset, game_ids, player_ids, observations):
+    """Scan one chunk; positions are offset back to the full table."""
+    scan = IllegalMoveScan()
+    for i, observation in enumerate(observations):
+        if not INVALID_RE.search(observation):
+            continue
+        key = (game_ids[i], player_ids[i])
+        scan.positions.append(offset + i)
+        scan.per_player[key] += 1
+        reason = extract_reason(observation)
+        if reason:
+            scan.reasons[reason] += 1
+        if ELIMINATED_TEXT in observation:
+            scan.eliminated.add(key)
+    return scan
+
+
+def iter_chunks(turns, chunk_size):
+    game_ids = turns['game_id'].tolist()
+    player_ids = turns['player_id'].tolist()
+    observations = turns['observation'].tolist()
+    for start in range(0, len(turns), chunk_size):
+        end = start + chunk_size
+        yield start, game_ids[start:end], player_ids[start:end], observations[start:end]
+
+
+def scan_illegal_moves(turns, workers=None, chunk_size=CHUNK_SIZE):
+    """Scan a turns frame (game_id, player_id, observation) across `workers` processes."""
+    workers = workers or os.cpu_count() or 1
+    result = IllegalMoveScan()
+    chunks = iter_chunks(turns, chunk_size)
+
+    if workers == 1:
+        for chunk in chunks:
+            result.merge(scan_chunk(*chunk))
+        return result
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # map() yields in submission order, which keeps positions sorted
+        for partial in pool.map(scan_chunk, *zip(*chunks)):
+            result.merge(partial)
+    return result
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Single entry point for the Secret Mafia analysis scripts
+
+  python mafia.py explore
+  python mafia.py analyze --incremental
+  python mafia.py visualize --force
+
+Only the standard library is imported until a subcommand runs; the script
+behind it is imported then, and any arguments after the subcommand are passed
+through to it, so `python mafia.py analyze --help` prints the script's own
+options. All loaders of one invocation share the store's dataset
+handles (see mafia_store.open_table). --timing prints the time spent
+starting up, importing the subcommand and running it; --profile and --trace
+write the stage spans of the run as JSON and as a Chrome trace (see
+mgc_common.instrument).
+"""
+
+import argparse
+import importlib
+import sys
+import time
+
+START = time.perf_counter()
+
+# Subcommand -> (script module, help, whether the script parses options of its own)
+COMMANDS = {
+    'explore': ('explore_data', 'dataset overview and model_summary.csv', False),
+    'analyze': ('detailed_analysis', 'win conditions, corrected win rates and ratings', True),
+    'illegal-moves': ('analyze_illegal_moves', 'illegal move types, examples and per-model rates', False),
+    'show-game': ('show_complete_game', 'one complete game from every player\'s perspective', False),
+    'extract-observation': ('extract_single_observation', 'write EXAMPLE_OBSERVATION.md', False),
+    'inspect': ('inspect_data_structure', 'schema and record structure walkthrough', False),
+    'visualize': ('create_visualizations', 'render the figures', True),
+}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='mafia', description="Secret Mafia analysis scripts")
+    parser.add_argument('--timing', action='store_true', help='report startup, import and run time')
+    parser.add_argument('--profile', metavar='PATH', help='write per-stage times, rows, throughput and RSS as JSON')
+    parser.add_argument('--trace', metavar='PATH', help='write a Chrome trace of the stages')
+    commands = parser.add_subparsers(dest='command', required=True, metavar='command')
+    for name, (module, help_text, own_options) in COMMANDS.items():
+        # Scripts with options of their own also get -h/--help, and print their real usage for it
+        commands.add_parser(name, help=help_text, description=help_text, add_help=not own_options)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args, passthrough = parser.parse_known_args(argv)
+    module_name, _, own_options = COMMANDS[args.command]
+    if passthrough and not own_options:
+        parser.error(f"{args.command} takes no options: {' '.join(passthrough)}")
+    if args.profile or args.trace:
+        from mgc_common import instrument
+
+        instrument.enable(args.profile, args.trace)
+        instrument.record('mafia.startup', time.perf_counter() - START)
+    ready = time.perf_counter()
+
+    module = importlib.import_module(module_name)
+    imported = time.perf_counter()
+    if args.profile or args.trace:
+        instrument.record(f'mafia.import {module_name}', imported - ready)
+
+    # The scripts parse their own options from sys.argv
+    sys.argv = [f'mafia {args.command}'] + passthrough
+    module.main()
+    finished = time.perf_counter()
+
+    if args.timing:
+        print(f"\n[timing] startup {(ready - START) * 1000:.0f} ms, import {module_name} "
+              f"{(imported - ready) * 1000:.0f} ms, run {finished - imported:.2f}s", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
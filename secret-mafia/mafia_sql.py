@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Embedded SQL over the Parquet store
+
+Opens a DuckDB connection whose views read the store's Parquet parts directly,
+so aggregations run in parallel and out of core without loading the dataset
+into pandas:
+
+  records, turns          the store tables
+  roles                   records with an extracted role (game_results_with_roles.csv)
+  model_performance       per model, as model_performance_corrected.csv
+  model_summary           per model by dataset status, as model_summary.csv
+  role_performance        per model and role
+  team_performance        per team, and model_team_performance per model and team
+  opponent_performance    per (model, opponent model) pair: games together, and
+                          games and wins with the opponent on the other team
+
+  python mafia_sql.py "SELECT * FROM role_performance WHERE games >= 50"
+  python mafia_sql.py --view model_performance --limit 20
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import duckdb
+
+from mafia_store import STORE_DIR, ensure_store
+
+VIEWS = {
+    'roles': """
+        SELECT player_game_id, game_id, player_id, model_name, role, team, reason AS outcome, won, num_turns
+        FROM records WHERE num_observations > 0
+    """,
+    'model_performance': """
+        SELECT model_name, count(*) AS total_games, count(*) FILTER (WHERE won) AS wins,
+               avg(num_turns) AS avg_turns, wins / total_games AS win_rate
+        FROM roles GROUP BY model_name ORDER BY win_rate DESC, model_name
+    """,
+    'model_summary': """
+        SELECT model_name, count(*) AS total_games, avg(num_turns) AS avg_turns,
+               count(*) FILTER (WHERE status = 'win') AS wins, wins / total_games AS win_rate
+        FROM records GROUP BY model_name ORDER BY win_rate DESC, model_name
+    """,
+    'role_performance': """
+        SELECT model_name, role, team, count(*) AS games, count(*) FILTER (WHERE won) AS wins,
+               wins / games AS win_rate
+        FROM roles GROUP BY model_name, role, team ORDER BY model_name, role
+    """,
+    'team_performance': """
+        SELECT team, count(*) AS games, count(*) FILTER (WHERE won) AS wins, wins / games AS win_rate
+        FROM roles GROUP BY team ORDER BY team
+    """,
+    'model_team_performance': """
+        SELECT model_name, team, count(*) AS games, count(*) FILTER (WHERE won) AS wins,
+               wins / games AS win_rate
+        FROM roles GROUP BY model_name, team ORDER BY model_name, team
+    """,
+    # Opponents come from the other records of the same game, which is what
+    # opponent_names lists, without decoding its JSON for every row
+    'opponent_performance': """
+        SELECT p.model_name, o.model_name AS opponent_name,
+               count(*) AS games, count(*) FILTER (WHERE p.won) AS wins,
+               count(*) FILTER (WHERE p.team <> o.team) AS games_against,
+               count(*) FILTER (WHERE p.team <> o.team AND p.won) AS wins_against,
+               wins_against / nullif(games_against, 0) AS win_rate_against
+        FROM roles p JOIN roles o ON p.game_id = o.game_id AND p.player_id <> o.player_id
+        GROUP BY p.model_name, o.model_name ORDER BY p.model_name, o.model_name
+    """,
+}
+
+
+def connect(store_dir=STORE_DIR, threads=None, memory_limit=None):
+    """An in-memory DuckDB connection with the store tables and analysis views defined."""
+    ensure_store(store_dir)
+    config = {}
+    if threads:
+        config['threads'] = threads
+    if memory_limit:
+        config['memory_limit'] = memory_limit
+    connection = duckdb.connect(config=config)
+
+    for table in ('records', 'turns'):
+        parts = (Path(store_dir) / table / 'part-*.parquet').as_posix().replace("'", "''")
+        connection.execute(f"CREATE VIEW {table} AS SELECT * FROM read_parquet('{parts}')")
+    for name, sql in VIEWS.items():
+        connection.execute(f"CREATE VIEW {name} AS {sql}")
+    return connection
+
+
+def query(sql, params=None, connection=None):
+    """Run SQL against the store and return the result as a pandas DataFrame."""
+    connection = connection or connect()
+    return connection.execute(sql, params or []).df()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run SQL against the Secret Mafia store")
+    parser.add_argument('sql', nargs='?', help='query to run')
+    parser.add_argument('--view', choices=sorted(VIEWS), help='show one of the prebuilt views')
+    parser.add_argument('--limit', type=int, default=50, help='rows to print (default 50)')
+    parser.add_argument('--csv', help='write the full result to this CSV file')
+    parser.add_argument('--threads', type=int, help='DuckDB worker threads')
+    args = parser.parse_args()
+
+    if not args.sql and not args.view:
+        parser.error("give a query or --view")
+    sql = args.sql or f"SELECT * FROM {args.view}"
+
+    connection = connect(threads=args.threads)
+    start = time.perf_counter()
+    relation = connection.sql(sql)
+    if args.csv:
+        relation.write_csv(args.csv)
+        print(f"Saved: {args.csv}")
+    else:
+        print(relation.limit(args.limit).df().to_string(index=False))
+    print(f"\n({(time.perf_counter() - start) * 1000:.1f} ms)")
+
+
+if __name__ == '__main__':
+    main()
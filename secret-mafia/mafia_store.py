@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Normalized Parquet store for the Secret Mafia dataset
+
+The Hugging Face dataset is decoded once into two typed tables under data/:
+
+  records/  one row per player-game: metadata, role, team, reward and win flag
+  turns/    one row per game/player/timestamp: parsed UTC time, observation, action, role, team, won
+
+Every analysis script reads these tables instead of loading the dataset and
+re-parsing the observations JSON. Run this file to (re)build the store, or
+with --incremental to append only records above the high-water mark kept in
+data/manifest.json; the loaders build the store on first use if it is missing.
+MAFIA_STORE_DIR points every script at another store, e.g. one of synthetic
+games built by synthetic.py.
+
+Data stays in Arrow end to end: ingest streams record batches straight from
+the memory-mapped dataset cache, and the loaders memory-map the Parquet files
+and convert only the requested columns to pandas.
+"""
+
+import json
+import os
+from functools import lru_cache
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.fs
+import pyarrow.parquet as pq
+
+from mgc_common.instrument import span
+from observations import decode_rewards, decode_turns, parse_timestamps
+from roles import extract_role_team
+
+DATASET_NAME = "bobbycxy/mgc2025-secretmafia"
+STORE_DIR = Path(os.environ.get('MAFIA_STORE_DIR') or Path(__file__).resolve().parent / 'data')
+INGEST_BATCH_SIZE = 2000
+MANIFEST_NAME = 'manifest.json'
+# Manifest fields that change on every ingest that changes the store's contents
+STATE_KEYS = ('version', 'parts', 'records', 'high_water_mark')
+STATE_METADATA_KEY = b'mafia_store_state'
+# Bumped whenever a table schema or the parsing of a column changes; stores of another version are rebuilt
+STORE_VERSION = 3
+
+RECORDS_SCHEMA = pa.schema([
+    ('player_game_id', pa.int64()),
+    ('game_id', pa.int64()),
+    ('player_id', pa.int16()),
+    ('env_name', pa.string()),
+    ('model_name', pa.string()),
+    ('opponent_names', pa.string()),
+    ('rewards', pa.string()),
+    ('reward', pa.int8()),
+    ('num_turns', pa.int16()),
+    ('num_observations', pa.int16()),
+    ('status', pa.string()),
+    ('reason', pa.string()),
+    ('role', pa.string()),
+    ('team', pa.string()),
+    ('won', pa.bool_()),
+])
+
+TURNS_SCHEMA = pa.schema([
+    ('game_id', pa.int64()),
+    ('player_id', pa.int16()),
+    ('turn', pa.int16()),
+    ('timestamp', pa.string()),
+    ('time', pa.timestamp('us', tz='UTC')),
+    ('observation', pa.string()),
+    ('action', pa.string()),
+    ('role', pa.string()),
+    ('team', pa.string()),
+    ('won', pa.bool_()),
+])
+
+
+def player_won(team, reason):
+    """A player wins when the game outcome names their team."""
+    return (team == 'Mafia' and 'Mafia wins' in reason) or \
+           (team == 'Village' and 'Village wins' in reason)
+
+
+def normalize_records(raw_records):
+    """Split raw dataset records into (records, turns) lists of row dicts."""
+    records = []
+    turns = []
+
+    for rec in raw_records:
+        entries = list(decode_turns(rec['observations']).items())
+
+        role, team = extract_role_team(entries[0][1].observation) if entries else (None, None)
+        won = player_won(team, rec['reason'])
+        reward = decode_rewards(rec['rewards']).get(str(rec['player_id']))
+
+        records.append({
+            'player_game_id': rec['player_game_id'],
+            'game_id': rec['game_id'],
+            'player_id': rec['player_id'],
+            'env_name': rec['env_name'],
+            'model_name': rec['model_name'],
+            'opponent_names': rec['opponent_names'],
+            'rewards': rec['rewards'],
+            'reward': reward,
+            'num_turns': rec['num_turns'],
+            'num_observations': len(entries),
+            'status': rec['status'],
+            'reason': rec['reason'],
+            'role': role,
+            'team': team,
+            'won': won,
+        })
+
+        for turn, (timestamp, entry) in enumerate(entries, 1):
+            turns.append({
+                'game_id': rec['game_id'],
+                'player_id': rec['player_id'],
+                'turn': turn,
+                'timestamp': timestamp,
+                'observation': entry.observation,
+                'action': entry.action,
+                'role': role,
+                'team': team,
+                'won': won,
+            })
+
+    return records, turns
+
+
+def turns_table(turns):
+    """Arrow turns table from row dicts, parsing every timestamp key into `time` in one vectorized call."""
+    table = pa.Table.from_pylist(turns, schema=TURNS_SCHEMA.remove(TURNS_SCHEMA.get_field_index('time')))
+    times = parse_timestamps(table['timestamp']).cast(TURNS_SCHEMA.field('time').type)
+    return table.add_column(TURNS_SCHEMA.get_field_index('time'), TURNS_SCHEMA.field('time'), times)
+
+
+def load_source():
+    """The raw dataset as an Arrow table backed by the memory-mapped HF cache."""
+    from datasets import load_dataset
+
+    print("Loading dataset from Hugging Face...")
+    with span('store.load_dataset') as stage:
+        table = load_dataset(DATASET_NAME)['train'].data.table
+        stage.add(table.num_rows)
+    return table
+
+
+def read_manifest(store_dir=STORE_DIR):
+    """The store manifest, or None if the store has not been built."""
+    path = Path(store_dir) / MANIFEST_NAME
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def ingest(source=None, store_dir=STORE_DIR, incremental=False):
+    """Decode the dataset (or the given Arrow table / raw records) into the Parquet store.
+
+    With `incremental`, only records above the stored `player_game_id` high-water
+    mark are decoded and they are appended as a new part; otherwise the store is
+    rebuilt. Returns the number of records written.
+    """
+    if source is None:
+        source = load_source()
+    elif not isinstance(source, pa.Table):
+        source = pa.Table.from_pylist(list(source))
+
+    store_dir = Path(store_dir)
+    manifest = read_manifest(store_dir) if incremental else None
+    if manifest is not None and manifest.get('version') != STORE_VERSION:
+        print("Store was built with an older schema, rebuilding it...")
+        manifest = None
+    if manifest is None:
+        manifest = {'parts': 0, 'records': 0, 'high_water_mark': None}
+        # Without a manifest a half-rebuilt store is seen as missing and rebuilt again
+        (store_dir / MANIFEST_NAME).unlink(missing_ok=True)
+        for name in ('records', 'turns'):
+            for part in (store_dir / name).glob('part-*.parquet'):
+                part.unlink()
+    else:
+        # Filter on the raw key column so already ingested records are never decoded
+        source = source.filter(pc.greater(source['player_game_id'], manifest['high_water_mark']))
+        if source.num_rows == 0:
+            print(f"No new records above player_game_id {manifest['high_water_mark']:,}")
+            return 0
+
+    part_name = f"part-{manifest['parts']:05d}.parquet"
+    # Parts are written under a hidden name, which the dataset readers skip, and renamed once complete
+    records_path = store_dir / 'records' / f'.{part_name}'
+    turns_path = store_dir / 'turns' / f'.{part_name}'
+    records_path.parent.mkdir(parents=True, exist_ok=True)
+    turns_path.parent.mkdir(parents=True, exist_ok=True)
+
+    print("Normalizing records into the store...")
+    num_records = num_turns = 0
+    # Only one batch of records is ever turned into Python objects at a time
+    with span('store.ingest', incremental=incremental) as stage, \
+            pq.ParquetWriter(records_path, RECORDS_SCHEMA, compression='zstd') as records_writer, \
+            pq.ParquetWriter(turns_path, TURNS_SCHEMA, compression='zstd') as turns_writer:
+        for batch in source.to_batches(max_chunksize=INGEST_BATCH_SIZE):
+            with span('store.decode', rows=batch.num_rows):
+                records, turns = normalize_records(batch.to_pylist())
+            with span('store.write', rows=len(turns)):
+                records_writer.write_table(pa.Table.from_pylist(records, schema=RECORDS_SCHEMA))
+                turns_writer.write_table(turns_table(turns))
+            num_records += len(records)
+            num_turns += len(turns)
+        stage.add(num_records)
+    records_path.replace(records_path.with_name(part_name))
+    turns_path.replace(turns_path.with_name(part_name))
+
+    manifest = {
+        'version': STORE_VERSION,
+        'parts': manifest['parts'] + 1,
+        'records': manifest['records'] + num_records,
+        'high_water_mark': max(pc.max(source['player_game_id']).as_py(), manifest['high_water_mark'] or 0),
+        'max_game_id': max(pc.max(source['game_id']).as_py(), manifest.get('max_game_id') or 0),
+    }
+    temporary = store_dir / f'{MANIFEST_NAME}.tmp'
+    temporary.write_text(json.dumps(manifest, indent=2))
+    temporary.replace(store_dir / MANIFEST_NAME)
+    open_table.cache_clear()
+
+    print(f"Stored {num_records:,} records and {num_turns:,} turns in {store_dir} ({part_name})")
+    return num_records
+
+
+def ensure_store(store_dir=STORE_DIR):
+    manifest = read_manifest(store_dir)
+    if manifest is None:
+        print(f"No observation store found at {store_dir}, building it once...")
+        ingest(store_dir=store_dir)
+    elif manifest.get('version') != STORE_VERSION:
+        print(f"Observation store at {store_dir} has an older schema, rebuilding it once...")
+        ingest(store_dir=store_dir)
+
+
+def store_state(store_dir=STORE_DIR):
+    """The manifest state a table derived from the store was built from, as a JSON string.
+
+    Derived tables (events, interned text, the text index) save it next to
+    themselves and are rebuilt when it no longer matches, e.g. after an
+    incremental or a full re-ingest.
+    """
+    ensure_store(store_dir)
+    manifest = read_manifest(store_dir)
+    return json.dumps({key: manifest.get(key) for key in STATE_KEYS}, sort_keys=True)
+
+
+def write_derived(table, path, store_dir=STORE_DIR):
+    """Write an Arrow table derived from the store, stamped with the current `store_state`."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    metadata = {**(table.schema.metadata or {}), STATE_METADATA_KEY: store_state(store_dir).encode()}
+    pq.write_table(table.replace_schema_metadata(metadata), path, compression='zstd')
+
+
+def is_current(path, store_dir=STORE_DIR):
+    """Whether a file written by `write_derived` exists and matches the current store."""
+    path = Path(path)
+    if not path.exists():
+        return False
+    metadata = pq.read_schema(path).metadata or {}
+    return metadata.get(STATE_METADATA_KEY) == store_state(store_dir).encode()
+
+
+@lru_cache(maxsize=None)
+def open_table(name, store_dir=STORE_DIR):
+    """The memory-mapped dataset handle of one store table, opened once per process."""
+    ensure_store(store_dir)
+    filesystem = pyarrow.fs.LocalFileSystem(use_mmap=True)
+    return ds.dataset(str(Path(store_dir) / name), format='parquet', filesystem=filesystem)
+
+
+def load_table(name, columns=None, filters=None, store_dir=STORE_DIR):
+    """One store table as Arrow, reading only the requested columns and matching rows."""
+    expression = pq.filters_to_expression(filters) if filters else None
+    with span('store.read', table=name) as stage:
+        table = open_table(name, store_dir).to_table(columns=columns, filter=expression)
+        stage.add(table.num_rows)
+    return table
+
+
+def to_pandas(table):
+    # Release each Arrow column as soon as it is converted so the peak never holds two copies
+    with span('store.to_pandas', rows=table.num_rows):
+        return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def iter_records(columns=None, batch_size=INGEST_BATCH_SIZE, store_dir=STORE_DIR):
+    """Stream the records table as pandas chunks without loading it whole."""
+    for batch in open_table('records', store_dir).to_batches(columns=columns, batch_size=batch_size):
+        yield batch.to_pandas()
+
+
+def load_records(columns=None, filters=None, store_dir=STORE_DIR):
+    """One row per player-game, without the observation text."""
+    return to_pandas(load_table('records', columns, filters, store_dir))
+
+
+def load_turns(columns=None, filters=None, store_dir=STORE_DIR):
+    """One row per game/player/timestamp, ordered as in the original observations."""
+    return to_pandas(load_table('turns', columns, filters, store_dir))
+
+
+if __name__ == '__main__':
+    import sys
+
+    ingest(incremental='--incremental' in sys.argv[1:])
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Sparse model-vs-model matchup matrices
+
+Every pair of records from the same game is one matchup of the row model with
+the column model. All pairs are enumerated in one vectorized pass over the
+records sorted by game (pairing each row with the next 1..n-1 rows of the
+same game, n being the largest game, covers every pair) and accumulated into
+scipy.sparse CSR matrices indexed by model:
+
+  games, wins                     row model played / won with the column model in the game
+  mafia_games, mafia_wins         row model was Mafia, column model was Village
+  village_games, village_wins     row model was Village, column model was Mafia
+
+Rows slice straight from CSR; columns from a CSC copy made on first use. The
+matrices are saved together in data/matchups.npz.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from mafia_store import STORE_DIR, load_records
+
+MATCHUPS_PATH = STORE_DIR / 'matchups.npz'
+MATRICES = ['games', 'wins', 'mafia_games', 'mafia_wins', 'village_games', 'village_wins']
+
+
+def matchup_pairs(records):
+    """(row, column) positions of every ordered pair of records from the same game.
+
+    The records must be sorted by game, so each game's rows are contiguous.
+    """
+    game_ids = records['game_id'].to_numpy()
+    starts = np.flatnonzero(np.r_[True, game_ids[1:] != game_ids[:-1]])
+    largest_game = np.diff(np.r_[starts, len(game_ids)]).max(initial=1)
+    first, second = [np.array([], int)], [np.array([], int)]
+    for offset in range(1, largest_game):
+        same_game = np.flatnonzero(game_ids[:-offset] == game_ids[offset:])
+        first.append(same_game)
+        second.append(same_game + offset)
+    first, second = np.concatenate(first), np.concatenate(second)
+    # Both orders, so every row model sees every other player of its game
+    return np.concatenate([first, second]), np.concatenate([second, first])
+
+
+class Matchups:
+    """Sparse matchup counts between every pair of models."""
+
+    def __init__(self, models, matrices):
+        self.models = pd.Index(models, name='model_name')
+        self.matrices = {name: matrices[name].tocsr() for name in MATRICES}
+        self._columns = {}
+
+    @classmethod
+    def from_records(cls, records=None):
+        """Build every matrix from records with game_id, model_name, team and won."""
+        if records is None:
+            records = load_records(columns=['game_id', 'player_id', 'model_name', 'team', 'won'])
+        records = records.sort_values(['game_id', 'player_id'], kind='stable')
+        codes, models = pd.factorize(records['model_name'], sort=True)
+        team = records['team'].to_numpy()
+        won = records['won'].fillna(False).to_numpy(dtype=bool)
+
+        row, column = matchup_pairs(records)
+        shape = (len(models), len(models))
+
+        def accumulate(mask):
+            counts = np.ones(mask.sum(), dtype=np.int32)
+            return sparse.coo_matrix((counts, (codes[row[mask]], codes[column[mask]])), shape=shape).tocsr()
+
+        everyone = np.ones(len(row), dtype=bool)
+        mafia = (team[row] == 'Mafia') & (team[column] == 'Village')
+        village = (team[row] == 'Village') & (team[column] == 'Mafia')
+        row_won = won[row]
+        return cls(models, {
+            'games': accumulate(everyone),
+            'wins': accumulate(row_won),
+            'mafia_games': accumulate(mafia),
+            'mafia_wins': accumulate(mafia & row_won),
+            'village_games': accumulate(village),
+            'village_wins': accumulate(village & row_won),
+        })
+
+    def save(self, path=MATCHUPS_PATH):
+        arrays = {'models': np.asarray(self.models, dtype=str)}
+        for name, matrix in self.matrices.items():
+            arrays.update({f'{name}_data': matrix.data, f'{name}_indices': matrix.indices,
+                           f'{name}_indptr': matrix.indptr})
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path=MATCHUPS_PATH):
+        with np.load(path) as arrays:
+            models = arrays['models']
+            shape = (len(models), len(models))
+            matrices = {name: sparse.csr_matrix((arrays[f'{name}_data'], arrays[f'{name}_indices'],
+                                                 arrays[f'{name}_indptr']), shape=shape)
+                        for name in MATRICES}
+        return cls(models, matrices)
+
+    def _position(self, model):
+        return self.models.get_loc(model)
+
+    def row(self, model, matrix='games'):
+        """Nonzero counts of one model against every column model."""
+        values = self.matrices[matrix].getrow(self._position(model))
+        return pd.Series(values.data, index=self.models[values.indices], name=matrix).sort_index()
+
+    def column(self, model, matrix='games'):
+        """Nonzero counts of every row model against one model."""
+        if matrix not in self._columns:
+            self._columns[matrix] = self.matrices[matrix].tocsc()
+        values = self._columns[matrix].getcol(self._position(model))
+        return pd.Series(values.data, index=self.models[values.indices], name=matrix).sort_index()
+
+    def head_to_head(self, model, opponent):
+        """Every count of `model` in games with `opponent`."""
+        i, j = self._position(model), self._position(opponent)
+        return {name: int(matrix[i, j]) for name, matrix in self.matrices.items()}
+
+    def opponents(self, model):
+        """One row per opponent model: games, wins and the per-team splits."""
+        frame = pd.concat([self.row(model, name) for name in MATRICES], axis=1).fillna(0).astype('int64')
+        frame['win_rate'] = frame['wins'] / frame['games']
+        return frame.sort_values('games', ascending=False)
+
+    def nbytes(self):
+        return sum(m.data.nbytes + m.indices.nbytes + m.indptr.nbytes for m in self.matrices.values())
+
+
+if __name__ == '__main__':
+    records = load_records(columns=['game_id', 'player_id', 'model_name', 'team', 'won'])
+    start = time.perf_counter()
+    matchups = Matchups.from_records(records)
+    elapsed = time.perf_counter() - start
+    matchups.save()
+
+    games = matchups.matrices['games']
+    print(f"Built {len(MATRICES)} {games.shape[0]}x{games.shape[1]} matrices from {len(records):,} records "
+          f"in {elapsed * 1000:.0f} ms ({games.nnz:,} model pairs, {matchups.nbytes() / 1024:.0f} KB)")
+    print(f"Saved: {MATCHUPS_PATH}")
+
+    most_played = records['model_name'].value_counts().index[0]
+    print(f"\nMost frequent opponents of {most_played}:")
+    print(matchups.opponents(most_played).head(10).to_string())
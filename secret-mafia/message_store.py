@@ -0,0 +1,173 @@
+"""
+Content-addressed, deduplicated storage of observation text
+
+An observation is the running transcript a player sees, and all six players
+of a game see the same moderator announcements and public chat. Storing each
+observation string verbatim therefore repeats most of the text many times.
+
+This store splits every observation at its bracketed message boundaries into
+segments, interns each distinct segment once under a 64-bit content digest,
+and keeps only a list of segment ids per turn:
+
+  data/interned/messages.parquet  id, digest, text     (one row per distinct segment)
+  data/interned/refs.parquet      game_id, player_id, turn, timestamp, message_ids
+
+Concatenating a turn's segments gives back the original observation exactly,
+including whitespace and any text before the first message. Both files are
+rebuilt whenever the store has changed since they were written.
+"""
+
+import sys
+import time
+from hashlib import blake2b
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from events import MESSAGE_RE
+from mafia_store import STORE_DIR, is_current, load_table, write_derived
+
+INTERNED_DIR = STORE_DIR / 'interned'
+
+MESSAGES_SCHEMA = pa.schema([
+    ('id', pa.int32()),
+    ('digest', pa.int64()),
+    ('text', pa.string()),
+])
+
+REFS_SCHEMA = pa.schema([
+    ('game_id', pa.int64()),
+    ('player_id', pa.int16()),
+    ('turn', pa.int16()),
+    ('timestamp', pa.string()),
+    ('message_ids', pa.list_(pa.int32())),
+])
+
+
+def digest(text):
+    """64-bit content address of a segment."""
+    return int.from_bytes(blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little', signed=True)
+
+
+def split_segments(text):
+    """Split an observation at message starts; the segments concatenate back to `text`."""
+    starts = [match.start() for match in MESSAGE_RE.finditer(text)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    return [text[start:end] for start, end in zip(starts, starts[1:] + [len(text)])]
+
+
+class MessageInterner:
+    """Assigns one dense id per distinct segment, keyed by its content digest."""
+
+    def __init__(self):
+        self.ids = {}       # digest -> id
+        self.digests = []
+        self.texts = []
+
+    def __len__(self):
+        return len(self.texts)
+
+    def intern(self, segment):
+        key = digest(segment)
+        message_id = self.ids.get(key)
+        if message_id is None:
+            message_id = self.ids[key] = len(self.texts)
+            self.digests.append(key)
+            self.texts.append(segment)
+        elif self.texts[message_id] != segment:
+            raise ValueError(f"digest collision between two segments ({key:#x})")
+        return message_id
+
+    def intern_observation(self, observation):
+        return [self.intern(segment) for segment in split_segments(observation)]
+
+    def table(self):
+        return pa.table({'id': pa.array(range(len(self.texts)), pa.int32()),
+                         'digest': pa.array(self.digests, pa.int64()),
+                         'text': pa.array(self.texts, pa.string())}, schema=MESSAGES_SCHEMA)
+
+
+def build_interned(turns):
+    """Intern the observations of a turns table into (messages, refs) Arrow tables."""
+    interner = MessageInterner()
+    message_ids = [interner.intern_observation(observation)
+                   for observation in turns['observation'].to_pylist()]
+    refs = pa.table({
+        'game_id': turns['game_id'],
+        'player_id': turns['player_id'],
+        'turn': turns['turn'],
+        'timestamp': turns['timestamp'],
+        'message_ids': pa.array(message_ids, pa.list_(pa.int32())),
+    }, schema=REFS_SCHEMA)
+    return interner.table(), refs
+
+
+def save_interned(messages, refs, interned_dir=INTERNED_DIR, store_dir=STORE_DIR):
+    interned_dir = Path(interned_dir)
+    write_derived(messages, interned_dir / 'messages.parquet', store_dir)
+    write_derived(refs, interned_dir / 'refs.parquet', store_dir)
+
+
+def load_interned(interned_dir=INTERNED_DIR, rebuild=False, store_dir=STORE_DIR):
+    """The (messages, refs) tables, interned from the turns table whenever the store has changed."""
+    interned_dir = Path(interned_dir)
+    current = all(is_current(interned_dir / name, store_dir) for name in ('messages.parquet', 'refs.parquet'))
+    if rebuild or not current:
+        print("Interning observation segments...")
+        turns = load_table('turns', columns=['game_id', 'player_id', 'turn', 'timestamp', 'observation'],
+                           store_dir=store_dir)
+        save_interned(*build_interned(turns), interned_dir, store_dir)
+    return (pq.read_table(interned_dir / 'messages.parquet', memory_map=True),
+            pq.read_table(interned_dir / 'refs.parquet', memory_map=True))
+
+
+def decode_observations(messages, message_ids):
+    """Rebuild observation strings from a list<int32> column of segment ids, vectorized in Arrow.
+
+    Segment ids are row positions in `messages`, so decoding is a single take
+    followed by a per-list string join.
+    """
+    message_ids = message_ids.combine_chunks() if isinstance(message_ids, pa.ChunkedArray) else message_ids
+    segments = pc.take(messages['text'].combine_chunks(), message_ids.flatten())
+    offsets = pc.subtract(message_ids.offsets, message_ids.offsets[0])
+    return pc.binary_join(pa.ListArray.from_arrays(offsets, segments), '')
+
+
+def reconstruct(messages, refs, game_id, player_id, turn):
+    """The original observation string of one turn."""
+    mask = pc.and_(pc.and_(pc.equal(refs['game_id'], game_id), pc.equal(refs['player_id'], player_id)),
+                   pc.equal(refs['turn'], turn))
+    ids = refs.filter(mask)['message_ids']
+    if len(ids) == 0:
+        raise KeyError((game_id, player_id, turn))
+    return decode_observations(messages, ids)[0].as_py()
+
+
+def report(messages, refs):
+    """Print dedup ratio and decode throughput against the stored observation strings."""
+    observations = load_table('turns', columns=['observation'])['observation']
+    raw_bytes = pc.sum(pc.binary_length(observations)).as_py()
+    unique_bytes = pc.sum(pc.binary_length(messages['text'])).as_py()
+    ref_bytes = refs['message_ids'].nbytes
+
+    start = time.perf_counter()
+    decoded = decode_observations(messages, refs['message_ids'])
+    elapsed = time.perf_counter() - start
+
+    if not decoded.equals(observations.combine_chunks()):
+        print("MISMATCH: interned observations do not reconstruct the originals")
+        raise SystemExit(1)
+
+    num_refs = pc.sum(pc.list_value_length(refs['message_ids'])).as_py()
+    print(f"Observations: {len(refs):,} ({raw_bytes / 1e6:.1f} MB of text)")
+    print(f"Segments:     {num_refs:,} references to {len(messages):,} distinct segments "
+          f"({unique_bytes / 1e6:.1f} MB + {ref_bytes / 1e6:.1f} MB of ids)")
+    print(f"Dedup ratio:  {raw_bytes / (unique_bytes + ref_bytes):.1f}x")
+    print(f"Decode:       {elapsed:.2f}s ({raw_bytes / 1e6 / elapsed:.0f} MB/sec), lossless")
+
+
+if __name__ == '__main__':
+    report(*load_interned(rebuild='--rebuild' in sys.argv[1:]))
@@ -0,0 +1,77 @@
+"""
+Mergeable per-model aggregates for the win-rate tables
+
+`ModelStats` keeps integer state per model (games, wins and the sum of game
+lengths), so chunks of records can be folded in one at a time and partial
+results from separate shards or processes combine exactly with `merge`.
+The derived columns match model_performance_corrected.csv, and `wins` and
+`total_games` are the inputs of `uncertainty.wilson_ci`.
+"""
+
+import json
+
+import pandas as pd
+
+STATE_COLUMNS = ['total_games', 'wins', 'turn_sum']
+
+
+class ModelStats:
+    """Streaming per-model games, wins and turn sums."""
+
+    def __init__(self, state=None):
+        if state is None:
+            state = pd.DataFrame({column: pd.Series(dtype='int64') for column in STATE_COLUMNS})
+            state.index.name = 'model_name'
+        self.state = state
+
+    @classmethod
+    def from_chunks(cls, chunks):
+        stats = cls()
+        for chunk in chunks:
+            stats.update(chunk)
+        return stats
+
+    @classmethod
+    def from_performance(cls, model_perf):
+        """Rebuild the state from a table with total_games, wins and avg_turns."""
+        state = pd.DataFrame({
+            'total_games': model_perf['total_games'].astype('int64'),
+            'wins': model_perf['wins'].astype('int64'),
+            'turn_sum': (model_perf['avg_turns'] * model_perf['total_games']).round().astype('int64'),
+        })
+        state.index.name = 'model_name'
+        return cls(state)
+
+    def update(self, chunk):
+        """Fold in a chunk of records with model_name, won and num_turns columns."""
+        partial = chunk.groupby('model_name').agg(
+            total_games=('won', 'size'),
+            wins=('won', 'sum'),
+            turn_sum=('num_turns', 'sum'),
+        ).astype('int64')
+        return self.merge(ModelStats(partial))
+
+    def merge(self, other):
+        """Add another shard's state into this one."""
+        self.state = self.state.add(other.state, fill_value=0).astype('int64')
+        return self
+
+    def wilson_inputs(self):
+        """(wins, total_games) per model, the arguments of a Wilson interval."""
+        return self.state['wins'], self.state['total_games']
+
+    def to_frame(self):
+        """Per-model total_games, wins, avg_turns and win_rate, best win rate first."""
+        perf = self.state[['total_games', 'wins']].copy()
+        perf['avg_turns'] = self.state['turn_sum'] / self.state['total_games']
+        perf['win_rate'] = perf['wins'] / perf['total_games']
+        return perf.sort_values('win_rate', ascending=False)
+
+    def to_json(self):
+        return json.dumps({model: row.tolist() for model, row in self.state[STATE_COLUMNS].iterrows()})
+
+    @classmethod
+    def from_json(cls, text):
+        state = pd.DataFrame.from_dict(json.loads(text), orient='index', columns=STATE_COLUMNS).astype('int64')
+        state.index.name = 'model_name'
+        return cls(state)
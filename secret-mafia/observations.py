@@ -0,0 +1,56 @@
+"""
+Typed decoding of the `observations` JSON column
+
+Each value is an object of timestamp -> {"observation": ..., "action": ...}.
+`decode_turns` decodes it with msgspec straight into slotted `Turn` structs
+instead of generic dicts. `iter_turns` only splits the object into its raw
+entries and decodes each one as it is reached, so callers that only need the
+first turns of a long game never build the strings of the rest.
+"""
+
+from typing import Dict, Iterator, Optional, Tuple
+
+import msgspec
+import pyarrow as pa
+
+
+class Turn(msgspec.Struct, gc=False):
+    """One timestamped entry of a player's observations."""
+    observation: str
+    action: Optional[str] = None
+
+
+_TURNS_DECODER = msgspec.json.Decoder(Dict[str, Turn])
+_REWARDS_DECODER = msgspec.json.Decoder(Dict[str, int])
+# Entries stay undecoded slices of the input until `iter_turns` reaches them
+_ENTRIES_DECODER = msgspec.json.Decoder(Dict[str, msgspec.Raw])
+_TURN_DECODER = msgspec.json.Decoder(Turn)
+
+
+def decode_turns(raw: str) -> Dict[str, Turn]:
+    """Decode a whole observations value into an ordered {timestamp: Turn} dict."""
+    return _TURNS_DECODER.decode(raw)
+
+
+def parse_timestamps(timestamps: pa.ChunkedArray) -> pa.Array:
+    """Parse observation keys such as '2025-08-18 02:22:29.7802+00' to UTC datetimes, in one pass.
+
+    The keys are parsed by mgc_common.timestamps, as IPD parses them, so both projects read
+    the same UTC time from a key. Keys that are not timestamps become null rather than raising.
+    """
+    import polars as pl
+    from mgc_common.timestamps import parse_timestamps as parse
+
+    keys = pl.from_arrow(timestamps).alias('timestamp').to_frame()
+    return keys.select(parse(pl.col('timestamp'))).to_series().to_arrow()
+
+
+def decode_rewards(raw: str) -> Dict[str, int]:
+    """Decode a rewards value into {player_id: reward}."""
+    return _REWARDS_DECODER.decode(raw)
+
+
+def iter_turns(raw: str) -> Iterator[Tuple[str, Turn]]:
+    """Lazily yield (timestamp, Turn) pairs in order, decoding each entry only when it is reached."""
+    for timestamp, entry in _ENTRIES_DECODER.decode(raw).items():
+        yield timestamp, _TURN_DECODER.decode(entry)
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Team-aware Bradley-Terry ratings for the model leaderboard
+
+Raw win rates mix up model strength with the team a model happened to be
+dealt (Mafia wins about two thirds of games) and with who it played against.
+Here every game is one Mafia-vs-Village comparison:
+
+  P(Mafia wins) = sigmoid(mafia_advantage + mean(r[mafia]) - mean(r[village]))
+
+The games form a sparse design matrix X (one row per game, +1/|Mafia| for
+each Mafia player's model, -1/|Village| for each Village player's model), and
+the ratings r and the shared mafia_advantage are fit together by L-BFGS on the
+L2-regularized log loss with its analytic gradient. New games are appended as
+rows and the fit is warm-started from the previous ratings. A fit that does
+not converge keeps its last iterate and sets `converged` for the caller to
+report.
+
+A model that plays on both teams of one game is only compared with itself
+there, which says nothing about its strength, so its entries in that game
+cancel out instead of being summed into a net weight.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.optimize import minimize
+from scipy.special import expit
+
+from mafia_store import load_records
+
+RATINGS_CSV = 'model_ratings.csv'
+RECORD_COLUMNS = ['game_id', 'player_id', 'model_name', 'team', 'won']
+L2 = 1.0
+TEAMS = ('Mafia', 'Village')
+
+
+def game_design(records, models):
+    """(X, mafia_won, game_ids) for every game with players on both teams.
+
+    `models` fixes the column order; every model in `records` must be in it.
+    """
+    roles = records[records['team'].isin(TEAMS)]
+    mafia = (roles['team'] == 'Mafia').to_numpy()
+    team_sizes = roles.groupby(['game_id', 'team'])['player_id'].transform('size').to_numpy()
+
+    per_game = pd.DataFrame({'game_id': roles['game_id'].to_numpy(), 'mafia': mafia,
+                             'mafia_won': mafia & roles['won'].fillna(False).to_numpy(dtype=bool)})
+    per_game = per_game.groupby('game_id').agg(players=('mafia', 'size'), mafia=('mafia', 'sum'),
+                                               mafia_won=('mafia_won', 'any'))
+    complete = per_game[(per_game['mafia'] > 0) & (per_game['mafia'] < per_game['players'])]
+
+    keep = roles['game_id'].isin(complete.index).to_numpy()
+    rows = complete.index.get_indexer(roles['game_id'].to_numpy()[keep])
+    columns = models.get_indexer(roles['model_name'].to_numpy()[keep])
+    weights = np.where(mafia[keep], 1.0, -1.0) / team_sizes[keep]
+    # Zero a model's entries in a game where it is on both teams; duplicates would otherwise be summed
+    both_teams = pd.DataFrame({'row': rows, 'column': columns, 'mafia': mafia[keep]}) \
+        .groupby(['row', 'column'])['mafia'].transform('nunique').to_numpy() > 1
+    weights[both_teams] = 0.0
+    X = sparse.csr_matrix((weights, (rows, columns)), shape=(len(complete), len(models)))
+    X.eliminate_zeros()
+    return X, complete['mafia_won'].to_numpy(dtype=float), complete.index.to_numpy()
+
+
+def fit(X, mafia_won, l2=L2, initial=None):
+    """Fit (ratings, mafia_advantage, result) by L-BFGS; `initial` warm-starts from [ratings..., advantage].
+
+    `result` is scipy's OptimizeResult; when the fit did not converge the
+    ratings are its last iterate.
+    """
+    XT = X.T.tocsr()
+
+    def loss_and_gradient(params):
+        ratings, advantage = params[:-1], params[-1]
+        z = X @ ratings + advantage
+        # log(1 + e^z) - y*z, computed without overflow
+        loss = np.sum(np.maximum(z, 0) + np.log1p(np.exp(-np.abs(z))) - mafia_won * z) + 0.5 * l2 * ratings @ ratings
+        residual = expit(z) - mafia_won
+        gradient = np.append(XT @ residual + l2 * ratings, residual.sum())
+        return loss, gradient
+
+    x0 = np.zeros(X.shape[1] + 1) if initial is None else initial
+    result = minimize(loss_and_gradient, x0, jac=True, method='L-BFGS-B')
+    return result.x[:-1], result.x[-1], result
+
+
+class Ratings:
+    """Fitted model ratings and the design they were fit on, so new games can be folded in."""
+
+    def __init__(self, models, X, mafia_won, game_ids, l2=L2, initial=None):
+        self.models = pd.Index(models, name='model_name')
+        self.X, self.mafia_won, self.game_ids, self.l2 = X, mafia_won, game_ids, l2
+        self.ratings, self.mafia_advantage, result = fit(X, mafia_won, l2, initial)
+        self.converged, self.fit_message = bool(result.success), str(result.message)
+
+    @classmethod
+    def from_records(cls, records=None, l2=L2, previous=None):
+        """Fit on every game; `previous` (a to_frame() table) warm-starts the models it rates."""
+        if records is None:
+            records = load_records(columns=RECORD_COLUMNS)
+        models = pd.Index(sorted(records['model_name'].dropna().unique()), name='model_name')
+        X, mafia_won, game_ids = game_design(records, models)
+        initial = None
+        if previous is not None:
+            initial = np.append(previous['rating'].reindex(models).fillna(0).to_numpy(), 0.0)
+        return cls(models, X, mafia_won, game_ids, l2, initial)
+
+    def update(self, new_records):
+        """A refit with the unseen games of `new_records` appended, warm-started from these ratings."""
+        new_records = new_records[~new_records['game_id'].isin(self.game_ids)]
+        new_models = sorted(set(new_records['model_name'].dropna()) - set(self.models))
+        models = self.models.append(pd.Index(new_models, name='model_name'))
+
+        X, mafia_won, game_ids = game_design(new_records, models)
+        old_X = sparse.csr_matrix((self.X.data, self.X.indices, self.X.indptr), shape=(self.X.shape[0], len(models)))
+        initial = np.concatenate([self.ratings, np.zeros(len(new_models)), [self.mafia_advantage]])
+        return Ratings(models, sparse.vstack([old_X, X], format='csr'),
+                       np.concatenate([self.mafia_won, mafia_won]),
+                       np.concatenate([self.game_ids, game_ids]), self.l2, initial)
+
+    def to_frame(self):
+        """Per-model rating, rated games and raw win rate, best rating first."""
+        X = self.X.tocoo()
+        # A model won a game when its side of the design row matches the outcome
+        won = (X.data > 0) == (self.mafia_won[X.row] == 1)
+        games = np.bincount(X.col, minlength=len(self.models))
+        mafia_games = np.bincount(X.col, weights=X.data > 0, minlength=len(self.models)).astype('int64')
+        wins = np.bincount(X.col, weights=won, minlength=len(self.models)).astype('int64')
+        frame = pd.DataFrame({'rating': self.ratings, 'games': games, 'mafia_games': mafia_games,
+                              'wins': wins, 'win_rate': wins / np.maximum(games, 1)}, index=self.models)
+        return frame.sort_values('rating', ascending=False)
+
+
+if __name__ == '__main__':
+    records = load_records(columns=RECORD_COLUMNS)
+
+    start = time.perf_counter()
+    ratings = Ratings.from_records(records)
+    elapsed = time.perf_counter() - start
+    if not ratings.converged:
+        print(f"Warning: the rating fit did not converge ({ratings.fit_message}), using its last iterate")
+    print(f"Fit {len(ratings.models):,} models on {len(ratings.game_ids):,} games in {elapsed * 1000:.0f} ms "
+          f"(Mafia advantage {ratings.mafia_advantage:+.3f} logits, P(Mafia win | equal teams) "
+          f"{expit(ratings.mafia_advantage):.3f})")
+
+    # Refit as if the last tenth of the games had just arrived
+    cutoff = np.quantile(records['game_id'], 0.9)
+    earlier = Ratings.from_records(records[records['game_id'] <= cutoff])
+    start = time.perf_counter()
+    updated = earlier.update(records[records['game_id'] > cutoff])
+    elapsed = time.perf_counter() - start
+    drift = np.abs(updated.to_frame()['rating'] - ratings.to_frame()['rating']).max()
+    print(f"Incremental update with the last 10% of games: {elapsed * 1000:.0f} ms "
+          f"(max difference from the full refit {drift:.1e})")
+
+    leaderboard = ratings.to_frame()
+    leaderboard.to_csv(RATINGS_CSV)
+    print(f"\nTop 20 models by rating:")
+    print(leaderboard.head(20).to_string())
+    print(f"\nSaved: {RATINGS_CSV}")
@@ -0,0 +1,53 @@
+"""
+Hash indexes for point lookups into the store tables
+
+Boolean masks like df[(df['game_id'] == g) & (df['player_id'] == p)] scan the
+whole frame on every call. These indexes map each key to its row positions
+once, so every later lookup is a dict access.
+"""
+
+
+class FrameIndex:
+    """Row positions of a DataFrame grouped by one or more key columns."""
+
+    def __init__(self, df, keys):
+        self.df = df
+        self.keys = [keys] if isinstance(keys, str) else list(keys)
+        group_keys = self.keys[0] if len(self.keys) == 1 else self.keys
+        self._positions = df.groupby(group_keys, sort=False).indices
+
+    def __contains__(self, key):
+        return key in self._positions
+
+    def __len__(self):
+        return len(self._positions)
+
+    def rows(self, *key):
+        """All rows for the key, in their original order."""
+        return self.df.iloc[self._positions[key[0] if len(key) == 1 else key]]
+
+    def first(self, *key):
+        """The first row for the key as a Series."""
+        return self.df.iloc[self._positions[key[0] if len(key) == 1 else key][0]]
+
+
+class RecordIndex:
+    """Point lookups over the records table by player, by game and by model."""
+
+    def __init__(self, records):
+        self.records = records
+        self.by_player = FrameIndex(records, ['game_id', 'player_id'])
+        self.by_game = FrameIndex(records, 'game_id')
+        self.model_counts = records['model_name'].value_counts()
+
+    def record(self, game_id, player_id):
+        """The record of one player in one game."""
+        return self.by_player.first(game_id, player_id)
+
+    def game(self, game_id):
+        """All records of one game, ordered by player_id."""
+        return self.by_game.rows(game_id).sort_values('player_id')
+
+    def model_games(self, model_name):
+        """Number of records played by a model."""
+        return int(self.model_counts.get(model_name, 0))
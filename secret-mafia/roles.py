@@ -0,0 +1,38 @@
+"""
+Role and team extraction from a player's first observation
+
+The first observation of every player carries the assignment lines:
+
+    Your role: Doctor
+    Team: Village
+
+`extract_role_team` reads one observation with precompiled patterns and
+`extract_roles` does the same for a whole column in one vectorized pass.
+"""
+
+import re
+
+import pandas as pd
+
+ROLE_PATTERN = r'Your role:([^\n]*)'
+TEAM_PATTERN = r'Team:([^\n]*)'
+
+_ROLE_RE = re.compile(ROLE_PATTERN)
+_TEAM_RE = re.compile(TEAM_PATTERN)
+
+
+def extract_role_team(first_obs):
+    """Return (role, team) from a player's first observation, None where absent."""
+    role_match = _ROLE_RE.search(first_obs)
+    team_match = _TEAM_RE.search(first_obs)
+    role = role_match.group(1).strip() if role_match else None
+    team = team_match.group(1).strip() if team_match else None
+    return role, team
+
+
+def extract_roles(first_observations):
+    """Return a role/team DataFrame aligned with a Series of first observations."""
+    return pd.DataFrame({
+        'role': first_observations.str.extract(ROLE_PATTERN, expand=False).str.strip(),
+        'team': first_observations.str.extract(TEAM_PATTERN, expand=False).str.strip(),
+    })
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Deterministic synthetic Secret Mafia games for scale and load testing
+
+Every game is played out by a small simulation of the real rules: Mafia,
+Doctor and Detective act at night, everybody discusses for a few rounds and
+votes by day, and the game ends when the Mafia are gone or reach parity. Each
+surviving player gets one raw record with the dataset's schema: observations
+JSON keyed by '2025-07-09 09:19:52.03938+00' style timestamps, rewards,
+opponent_names, the role lines of the first observation, moderator notices,
+invalid-move notices with their Reason and '[pid] [An error occurred: ...]'
+markers. Models have a fixed skill that makes their votes more accurate, so
+win rates and ratings have something to find.
+
+Game i depends only on (seed, i), so any number of games can be generated in
+batches and the first N games of a larger run are the same N games:
+
+  python synthetic.py --games 50000 --output data/synthetic-50k.arrow
+  python synthetic.py --games 50000 --store data/synthetic-50k
+
+--store ingests the games into a separate Parquet store; point the analysis
+scripts at it with MAFIA_STORE_DIR=data/synthetic-50k. The raw games are
+written as an Arrow IPC file, which ingest memory-maps like the dataset cache.
+"""
+
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pyarrow as pa
+
+RAW_SCHEMA = pa.schema([
+    ('player_game_id', pa.int64()),
+    ('game_id', pa.int64()),
+    ('player_id', pa.int64()),
+    ('env_name', pa.string()),
+    ('model_name', pa.string()),
+    ('opponent_names', pa.string()),
+    ('observations', pa.string()),
+    ('rewards', pa.string()),
+    ('num_turns', pa.int64()),
+    ('status', pa.string()),
+    ('reason', pa.string()),
+])
+
+ENV_NAME = 'SecretMafia-v0'
+FIRST_GAME_ID = 100000
+START_TIME = datetime(2025, 7, 1, tzinfo=timezone.utc)
+GAME_INTERVAL = timedelta(minutes=1)
+BATCH_GAMES = 1000
+
+MAFIA_WINS = 'Mafia reached parity with villagers. Mafia wins!'
+VILLAGE_WINS = 'All Mafia were eliminated. Village wins!'
+RESUBMIT = 'Please resubmit a valid move and remember to follow the game rules to avoid penalties.'
+
+DESCRIPTIONS = {
+    'Mafia': 'Each night, vote with your teammates to eliminate a villager. Blend in during the day.',
+    'Doctor': 'Protect one player each night from Mafia elimination.',
+    'Detective': 'Investigate one player each night to learn whether they are Mafia.',
+    'Villager': 'A regular villager. Your goal is to identify and eliminate all Mafia members '
+                'through voting during the day.',
+}
+# Role -> (night prompt verb, reason given for a malformed night action)
+NIGHT_ACTIONS = {
+    'Mafia': ('eliminate', 'Vote not in valid format or invalid target'),
+    'Doctor': ('protect', 'Invalid protection target'),
+    'Detective': ('investigate', 'Invalid investigation target'),
+}
+VOTE_REASON = 'Vote not in valid format or invalid target'
+ERROR_MESSAGES = ['Request timed out', 'Rate limit exceeded', 'Connection reset by peer',
+                  'Model returned an empty response']
+
+CLAIMS = [
+    'I think Player {0} is suspicious. They have been very quiet.',
+    'Player {0} keeps deflecting questions, that worries me.',
+    'I agree with Player {0}, we should look at who pushed the last vote.',
+    'I trust Player {0} for now, their reasoning has been consistent.',
+    'Player {0}, what is your defense?',
+    'Let us not rush. Player {0} has given us nothing to go on yet.',
+]
+FILLER = ('we need to think about who benefits from the last elimination and who has been steering the '
+          'discussion while staying out of the spotlight the votes so far tell a story worth following').split()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate deterministic synthetic Secret Mafia games")
+    parser.add_argument('--games', type=int, default=5000, help='number of games')
+    parser.add_argument('--players', type=int, default=6, help='players per game (at least 4)')
+    parser.add_argument('--rounds', type=int, default=3, help='discussion rounds per day')
+    parser.add_argument('--message-words', type=int, default=40, help='average extra words per chat message')
+    parser.add_argument('--models', type=int, default=40, help='number of distinct models')
+    parser.add_argument('--invalid-rate', type=float, default=0.05, help='chance that an action is malformed')
+    parser.add_argument('--error-rate', type=float, default=0.005, help='chance that a chat message is an error')
+    parser.add_argument('--drop-rate', type=float, default=0.07, help='chance that a player record is missing')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help='Arrow IPC file for the raw games '
+                                                        '(default: data/synthetic-<games>.arrow)')
+    parser.add_argument('--store', default=None, help='also ingest the games into a Parquet store here')
+    return parser.parse_args(argv)
+
+
+def model_names(count):
+    return [f'synthetic/model-{i:03d}' for i in range(count)]
+
+
+def model_skill(name, seed):
+    """Fixed per-model chance of voting for a Mafia member when one is suspected."""
+    return random.Random(f'{seed}:{name}').uniform(0.2, 0.8)
+
+
+def assign_roles(players):
+    mafia = players // 3
+    return ['Mafia'] * mafia + ['Doctor', 'Detective'] + ['Villager'] * (players - mafia - 2)
+
+
+class Game:
+    """One simulated game; `records()` returns a raw record per player."""
+
+    def __init__(self, index, options, models):
+        self.rng = random.Random(f'{options.seed}:{index}')
+        self.options = options
+        self.game_id = FIRST_GAME_ID + index
+        self.first_player_game_id = (FIRST_GAME_ID + index) * options.players
+        self.clock = START_TIME + index * GAME_INTERVAL + timedelta(seconds=self.rng.uniform(0, 30))
+
+        players = range(options.players)
+        self.roles = assign_roles(options.players)
+        self.rng.shuffle(self.roles)
+        self.models = self.rng.sample(models, options.players)
+        self.skill = [model_skill(model, options.seed) for model in self.models]
+        self.alive = set(players)
+        self.pending = {p: [self.introduction(p)] for p in players}
+        self.entries = {p: {} for p in players}
+        self.phases = 0
+
+    # Text
+
+    def introduction(self, player):
+        role = self.roles[player]
+        team = 'Mafia' if role == 'Mafia' else 'Village'
+        names = ', '.join(f'Player {p}' for p in range(self.options.players))
+        lines = [f'[-1] Welcome to Secret Mafia! You are Player {player}.',
+                 f'Your role: {role}', f'Team: {team}', f'Description: {DESCRIPTIONS[role]}',
+                 f'Players: {names}',
+                 'The game progresses through Day and Night phases.',
+                 f'- During the Day phase, there are {self.options.rounds} rounds of discussion followed by voting.',
+                 'The game ends when either all Mafia members are eliminated (Village wins) or',
+                 'Mafia members equal or outnumber Villagers (Mafia wins).']
+        if role == 'Mafia':
+            teammates = [p for p, other in enumerate(self.roles) if other == 'Mafia' and p != player]
+            lines.append('Your teammates are: ' + ', '.join(f'Player {p}' for p in teammates) + '.')
+        return '\n'.join(lines)
+
+    def chat(self, player):
+        if self.rng.random() < self.options.error_rate:
+            return f'An error occurred: {self.rng.choice(ERROR_MESSAGES)}'
+        target = self.rng.choice(sorted(self.alive - {player}))
+        words = self.rng.choices(FILLER, k=self.rng.randint(0, 2 * self.options.message_words))
+        return ' '.join([self.rng.choice(CLAIMS).format(target)] + words)
+
+    def valid_targets(self, player, exclude_self=True):
+        return sorted(self.alive - {player}) if exclude_self else sorted(self.alive)
+
+    # Mechanics
+
+    def tick(self):
+        self.clock += timedelta(seconds=self.rng.uniform(0.2, 12))
+        return self.clock.strftime('%Y-%m-%d %H:%M:%S.%f').rstrip('0').rstrip('.') + '+00'
+
+    def broadcast(self, line):
+        for p in self.alive:
+            self.pending[p].append(line)
+
+    def act(self, player, action):
+        """Record an action and the observation that led to it."""
+        self.entries[player][self.tick()] = {'observation': '\n'.join(self.pending[player]), 'action': action}
+        self.pending[player] = []
+
+    def act_validly(self, player, action, malformed, reason):
+        """Act, possibly after malformed attempts; False if the player was eliminated for one."""
+        while self.rng.random() < self.options.invalid_rate:
+            self.act(player, malformed)
+            if self.rng.random() < 0.1:
+                self.alive.discard(player)
+                self.broadcast(f'[-1] Player {player} has been eliminated by making an invalid move.')
+                return False
+            self.pending[player].append(f'[-1] Player {player} attempted an invalid move. Reason: {reason}. '
+                                        f'{RESUBMIT}')
+        self.act(player, action)
+        return True
+
+    def choose(self, player, candidates):
+        """A target, biased towards a Mafia member by the model's skill when choosing as the village."""
+        mafia = [p for p in candidates if self.roles[p] == 'Mafia']
+        if self.roles[player] != 'Mafia' and mafia and self.rng.random() < self.skill[player]:
+            return self.rng.choice(mafia)
+        return self.rng.choice(candidates)
+
+    def night(self):
+        self.phases += 1
+        kills, protected = [], None
+        for player in sorted(self.alive):
+            role = self.roles[player]
+            if role not in NIGHT_ACTIONS or not self.still_playing(player):
+                continue
+            verb, reason = NIGHT_ACTIONS[role]
+            candidates = self.valid_targets(player, exclude_self=role != 'Doctor')
+            if role == 'Mafia':
+                candidates = [p for p in candidates if self.roles[p] != 'Mafia'] or candidates
+            valid = ', '.join(f'[{p}]' for p in candidates)
+            self.pending[player].append(f'[-1] Night phase - choose one player to {verb}: {valid}')
+            target = self.choose(player, candidates)
+            if not self.act_validly(player, f'[Player {target}]', f'I will {verb} Player {target}.', reason):
+                continue
+            if role == 'Mafia':
+                kills.append(target)
+            elif role == 'Doctor':
+                protected = target
+            else:
+                verdict = 'IS a' if self.roles[target] == 'Mafia' else 'IS NOT a'
+                self.pending[player].append(f'[-1] Player {target} {verdict} Mafia member.')
+
+        victim = self.rng.choice(kills) if kills else None
+        if victim is None or victim == protected or victim not in self.alive:
+            self.broadcast('[-1] No one was killed tonight.')
+        else:
+            self.alive.discard(victim)
+            self.broadcast(f'[-1] Player {victim} was killed during the night.')
+
+    def day(self):
+        self.broadcast(f'[-1] Day breaks. Discuss for {self.options.rounds} rounds, then a vote will follow.')
+        for _ in range(self.options.rounds):
+            self.phases += 1
+            for player in sorted(self.alive):
+                if not self.still_playing(player):
+                    continue
+                message = self.chat(player)
+                self.act(player, message)
+                self.broadcast(f'[{player}] [{message}]')
+
+        self.phases += 1
+        votes = {}
+        for player in sorted(self.alive):
+            if not self.still_playing(player):
+                continue
+            candidates = self.valid_targets(player)
+            valid = ', '.join(f'[{p}]' for p in sorted(self.alive))
+            self.pending[player].append(f'[-1] Voting phase - submit one vote in format [X]. Valid: {valid}')
+            target = self.choose(player, candidates)
+            vote = str(target) if self.rng.random() < 0.5 else f'VOTE: Player {target}'
+            if self.act_validly(player, f'[{vote}]', f'My vote: **[{target}]**', VOTE_REASON):
+                votes[target] = votes.get(target, 0) + 1
+                self.broadcast(f'[{player}] [{vote}]')
+
+        if votes:
+            most = max(votes.values())
+            eliminated = self.rng.choice(sorted(p for p, count in votes.items() if count == most))
+            if eliminated in self.alive:
+                self.alive.discard(eliminated)
+                self.broadcast(f'[-1] Player {eliminated} was eliminated by vote.')
+
+    def still_playing(self, player):
+        """False once the player was eliminated earlier in this phase or the game is decided."""
+        return player in self.alive and self.outcome() is None
+
+    def outcome(self):
+        """The reason of the final result, or None while the game goes on."""
+        mafia = sum(self.roles[p] == 'Mafia' for p in self.alive)
+        if mafia == 0:
+            return VILLAGE_WINS
+        if mafia >= len(self.alive) - mafia:
+            return MAFIA_WINS
+        return None
+
+    def play(self):
+        reason = None
+        while reason is None:
+            self.night()
+            reason = self.outcome()
+            if reason is None:
+                self.day()
+                reason = self.outcome()
+        return reason
+
+    def records(self):
+        reason = self.play()
+        mafia_won = reason == MAFIA_WINS
+        rewards = json.dumps({str(p): 1 if (role == 'Mafia') == mafia_won else -1
+                              for p, role in enumerate(self.roles)})
+        records = []
+        for player in range(self.options.players):
+            if self.rng.random() < self.options.drop_rate:
+                continue
+            opponents = {str(p): model for p, model in enumerate(self.models) if p != player}
+            records.append({
+                'player_game_id': self.first_player_game_id + player,
+                'game_id': self.game_id,
+                'player_id': player,
+                'env_name': ENV_NAME,
+                'model_name': self.models[player],
+                'opponent_names': json.dumps(opponents),
+                'observations': json.dumps(self.entries[player]),
+                'rewards': rewards,
+                'num_turns': self.phases,
+                'status': 'finished',
+                'reason': reason,
+            })
+        return records
+
+
+def record_batches(options, batch_games=BATCH_GAMES):
+    """The games as Arrow record batches of `batch_games` games each."""
+    models = model_names(options.models)
+    for first in range(0, options.games, batch_games):
+        records = []
+        for index in range(first, min(first + batch_games, options.games)):
+            records.extend(Game(index, options, models).records())
+        yield pa.RecordBatch.from_pylist(records, schema=RAW_SCHEMA)
+
+
+def write_raw(options, path):
+    """Write the games to an Arrow IPC file batch by batch; returns the number of records."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    rows = 0
+    with pa.OSFile(str(path), 'wb') as sink, pa.ipc.new_file(sink, RAW_SCHEMA) as writer:
+        for batch in record_batches(options):
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    return rows
+
+
+def load_raw(path):
+    """A raw games file as a memory-mapped Arrow table, ready for mafia_store.ingest."""
+    return pa.ipc.open_file(pa.memory_map(str(path))).read_all()
+
+
+def main():
+    options = parse_args()
+    if options.players < 4:
+        raise SystemExit("--players must be at least 4")
+    output = Path(options.output or Path(__file__).resolve().parent / 'data' / f'synthetic-{options.games}.arrow')
+
+    start = time.perf_counter()
+    rows = write_raw(options, output)
+    print(f"Generated {options.games:,} games ({rows:,} records) in {time.perf_counter() - start:.1f}s "
+          f"-> {output} ({output.stat().st_size / 1e6:,.0f} MB)")
+
+    if options.store:
+        from mafia_store import ingest
+
+        start = time.perf_counter()
+        ingest(load_raw(output), store_dir=options.store)
+        print(f"Ingested in {time.perf_counter() - start:.1f}s; run the scripts with MAFIA_STORE_DIR={options.store}")
+
+
+if __name__ == '__main__':
+    main()
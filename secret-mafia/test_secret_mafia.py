@@ -0,0 +1,300 @@
+"""
+Behavior of the Secret Mafia store and analysis modules on small synthetic stores
+"""
+
+import contextlib
+import io
+import os
+import sqlite3
+import subprocess
+import sys
+from itertools import chain, permutations
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import mafia_store
+import ratings
+import synthetic
+import text_index
+from detailed_analysis import report_fit
+from events import CHAT_MESSAGE, EVENT_COLUMNS, load_events
+from matchups import MATRICES, Matchups
+from mafia_store import ingest, is_current, load_records, load_turns, read_manifest, store_state
+from message_store import decode_observations, load_interned
+from model_stats import ModelStats
+from timeline import TIMELINE_COLUMNS, Timelines, game_timeline, merge_player_streams
+
+HERE = Path(__file__).resolve().parent
+GAMES = 60
+NEW_GAMES = 20
+OUTPUTS = ['game_results_with_roles.csv', 'model_performance_corrected.csv', 'model_ratings.csv']
+
+
+def quietly(function, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return function(*args, **kwargs)
+
+
+@pytest.fixture(scope='module')
+def raw(tmp_path_factory):
+    """Raw files of GAMES and GAMES + NEW_GAMES games; the first GAMES games of both are the same."""
+    directory = tmp_path_factory.mktemp('raw')
+    paths = {}
+    for games in (GAMES, GAMES + NEW_GAMES):
+        paths[games] = directory / f'synthetic-{games}.arrow'
+        synthetic.write_raw(synthetic.parse_args(['--games', str(games), '--models', '12']), paths[games])
+    return paths
+
+
+@pytest.fixture(scope='module')
+def store(raw, tmp_path_factory):
+    """A store of the first GAMES games, shared by the tests that only read it."""
+    directory = tmp_path_factory.mktemp('store')
+    quietly(ingest, synthetic.load_raw(raw[GAMES]), store_dir=directory)
+    return directory
+
+
+def bump_store_version(raw, store, monkeypatch):
+    """Rebuild `store` as a store of the next version, as after a schema change."""
+    monkeypatch.setattr(mafia_store, 'STORE_VERSION', mafia_store.STORE_VERSION + 1)
+    quietly(ingest, synthetic.load_raw(raw[GAMES]), store_dir=store, incremental=True)
+    assert read_manifest(store)['version'] == mafia_store.STORE_VERSION
+
+
+def analyze(directory, store, *args):
+    """Run detailed_analysis.py in `directory` against `store`; returns its output tables."""
+    directory.mkdir(exist_ok=True)
+    env = dict(os.environ, MAFIA_STORE_DIR=str(store))
+    subprocess.run([sys.executable, str(HERE / 'detailed_analysis.py'), *args], cwd=directory, env=env,
+                   check=True, stdout=subprocess.DEVNULL)
+    return read_outputs(directory)
+
+
+def read_outputs(directory):
+    roles = pd.read_csv(directory / OUTPUTS[0]).sort_values('player_game_id').reset_index(drop=True)
+    performance = pd.read_csv(directory / OUTPUTS[1], index_col='model_name').sort_index()
+    ratings = pd.read_csv(directory / OUTPUTS[2], index_col='model_name').sort_index()
+    return roles, performance, ratings
+
+
+def assert_same_outputs(actual, expected):
+    pd.testing.assert_frame_equal(actual[0], expected[0])
+    pd.testing.assert_frame_equal(actual[1], expected[1])
+    # The incremental refit is warm-started from the previous ratings, so it lands within the tolerance
+    pd.testing.assert_frame_equal(actual[2], expected[2], check_exact=False, atol=1e-4)
+
+
+@pytest.fixture(scope='module')
+def full_outputs(raw, tmp_path_factory):
+    directory = tmp_path_factory.mktemp('full')
+    quietly(ingest, synthetic.load_raw(raw[GAMES + NEW_GAMES]), store_dir=directory / 'store')
+    return analyze(directory / 'out', directory / 'store')
+
+
+def test_incremental_analysis_matches_full(raw, full_outputs, tmp_path):
+    store = tmp_path / 'store'
+    quietly(ingest, synthetic.load_raw(raw[GAMES]), store_dir=store)
+    analyze(tmp_path / 'out', store)
+    incremental = analyze(tmp_path / 'out', store, '--incremental', '--source', str(raw[GAMES + NEW_GAMES]))
+    assert_same_outputs(incremental, full_outputs)
+
+
+def test_interrupted_incremental_analysis_is_redone(raw, full_outputs, tmp_path):
+    store = tmp_path / 'store'
+    quietly(ingest, synthetic.load_raw(raw[GAMES]), store_dir=store)
+    analyze(tmp_path / 'out', store)
+    quietly(ingest, synthetic.load_raw(raw[GAMES + NEW_GAMES]), store_dir=store, incremental=True)
+    # As if a run stopped after replacing the performance table but before appending the roles
+    full_outputs[1].to_csv(tmp_path / 'out' / OUTPUTS[1])
+
+    incremental = analyze(tmp_path / 'out', store, '--incremental', '--source', str(raw[GAMES + NEW_GAMES]))
+    assert_same_outputs(incremental, full_outputs)
+
+
+def test_interrupted_rebuild_leaves_no_manifest(raw, tmp_path, monkeypatch):
+    store = tmp_path / 'store'
+    quietly(ingest, synthetic.load_raw(raw[GAMES]), store_dir=store)
+    records = len(load_records(columns=['player_game_id'], store_dir=store))
+
+    def fail(batch):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(mafia_store, 'normalize_records', fail)
+    # An interrupted incremental ingest leaves the store as it was
+    with pytest.raises(KeyboardInterrupt):
+        quietly(ingest, synthetic.load_raw(raw[GAMES + NEW_GAMES]), store_dir=store, incremental=True)
+    mafia_store.open_table.cache_clear()
+    assert len(load_records(columns=['player_game_id'], store_dir=store)) == records
+    # An interrupted rebuild leaves no manifest, so the store is seen as missing rather than complete
+    with pytest.raises(KeyboardInterrupt):
+        quietly(ingest, synthetic.load_raw(raw[GAMES + NEW_GAMES]), store_dir=store)
+    assert read_manifest(store) is None
+
+
+def test_timelines_order_unparsed_keys_last(store):
+    turns = load_turns(columns=TIMELINE_COLUMNS, store_dir=store).copy()
+    # Every seventh turn gets a key that does not parse, in an order unrelated to the times
+    untimed = turns.index % 7 == 0
+    turns.loc[untimed, 'time'] = pd.NaT
+    turns.loc[untimed, 'timestamp'] = 'unparsed ' + (turns.index[untimed] * 7919 % 1000).astype(str)
+    timelines = Timelines(turns)
+    for game_id, game_turns in turns.groupby('game_id'):
+        merged = merge_player_streams(game_turns)
+        pd.testing.assert_frame_equal(merged, timelines.game(game_id))
+        timed = merged['time'].notna()
+        # Timed turns first, in time order; untimed ones after them, by raw key
+        assert not timed.iloc[timed.sum():].any()
+        assert merged.loc[timed, 'time'].is_monotonic_increasing
+        assert merged.loc[~timed, 'timestamp'].is_monotonic_increasing
+
+
+def test_game_timeline_follows_ingest(raw, tmp_path):
+    store = tmp_path / 'store'
+    quietly(ingest, synthetic.load_raw(raw[GAMES]), store_dir=store)
+    new_game = synthetic.FIRST_GAME_ID + GAMES
+    assert game_timeline(new_game, store).empty
+    quietly(ingest, synthetic.load_raw(raw[GAMES + NEW_GAMES]), store_dir=store, incremental=True)
+    assert not game_timeline(new_game, store).empty
+
+
+def test_model_stats_merge_and_round_trip(store):
+    records = load_records(columns=['model_name', 'won', 'num_turns'], store_dir=store)
+    single = ModelStats.from_chunks([records])
+    # Shards need not share their models: the second one never sees `model`
+    model = records['model_name'].iloc[0]
+    even, odd = records.iloc[::2], records.iloc[1::2]
+    shards = [even, odd[odd['model_name'] != model], odd[odd['model_name'] == model]]
+    merged = ModelStats()
+    for shard in shards:
+        merged.merge(ModelStats.from_chunks([shard]))
+    pd.testing.assert_frame_equal(merged.state.sort_index(), single.state.sort_index())
+
+    pd.testing.assert_frame_equal(ModelStats.from_json(single.to_json()).state, single.state)
+    rebuilt = ModelStats.from_performance(single.to_frame())
+    pd.testing.assert_frame_equal(rebuilt.state.sort_index(), single.state.sort_index())
+    assert single.state['total_games'].sum() == len(records)
+
+
+def test_event_table_types(store, tmp_path):
+    events = quietly(load_events, path=tmp_path / 'events.parquet', store_dir=store)
+    assert {name: events[name].dtype for name in EVENT_COLUMNS} == \
+        {name: np.dtype(dtype) for name, dtype in EVENT_COLUMNS.items()}
+    assert isinstance(events['message'].dtype, pd.CategoricalDtype)
+    assert (events['event_type'] == CHAT_MESSAGE).any()
+    assert set(events['game_id']) <= set(load_records(columns=['game_id'], store_dir=store)['game_id'])
+
+
+def test_events_rebuilt_after_store_version_bump(raw, tmp_path, monkeypatch):
+    store, path = tmp_path / 'store', tmp_path / 'events.parquet'
+    quietly(ingest, synthetic.load_raw(raw[GAMES]), store_dir=store)
+    events = quietly(load_events, path=path, store_dir=store)
+    assert is_current(path, store)
+
+    bump_store_version(raw, store, monkeypatch)
+    assert not is_current(path, store)
+    rebuilt = quietly(load_events, path=path, store_dir=store)
+    assert is_current(path, store)
+    pd.testing.assert_frame_equal(rebuilt, events)
+
+
+def test_interned_text_follows_the_store(raw, tmp_path, monkeypatch):
+    store, interned = tmp_path / 'store', tmp_path / 'interned'
+    quietly(ingest, synthetic.load_raw(raw[GAMES]), store_dir=store)
+    messages, refs = quietly(load_interned, interned, store_dir=store)
+    turns = load_turns(columns=['observation'], store_dir=store)
+    assert decode_observations(messages, refs['message_ids']).to_pylist() == turns['observation'].tolist()
+
+    quietly(ingest, synthetic.load_raw(raw[GAMES + NEW_GAMES]), store_dir=store, incremental=True)
+    messages, refs = quietly(load_interned, interned, store_dir=store)
+    assert refs.num_rows == len(load_turns(columns=['turn'], store_dir=store))
+
+    bump_store_version(raw, store, monkeypatch)
+    assert not is_current(interned / 'refs.parquet', store)
+    messages, refs = quietly(load_interned, interned, store_dir=store)
+    assert is_current(interned / 'messages.parquet', store) and is_current(interned / 'refs.parquet', store)
+    assert refs.num_rows == len(turns)
+
+
+def indexed_rows(path):
+    with contextlib.closing(sqlite3.connect(path)) as connection:
+        rows = dict(connection.execute("SELECT source, count(*) FROM observations GROUP BY source"))
+        state = dict(connection.execute("SELECT key, value FROM meta"))['store_state']
+    return rows, state
+
+
+def test_text_index_follows_the_store(raw, tmp_path):
+    store, path = tmp_path / 'store', tmp_path / 'text_index.sqlite'
+    quietly(ingest, synthetic.load_raw(raw[GAMES]), store_dir=store)
+    ipd_row = ('Round 1: I cooperate', 'ipd', 1, 0, '2025-08-18 02:22:29+00')
+    quietly(text_index.build_index, chain(text_index.mafia_rows(store), [ipd_row]), path, store)
+    assert indexed_rows(path) == ({'secret-mafia': len(load_turns(columns=['turn'], store_dir=store)), 'ipd': 1},
+                                  store_state(store))
+
+    # An incremental ingest appends the new part's turns
+    quietly(ingest, synthetic.load_raw(raw[GAMES + NEW_GAMES]), store_dir=store, incremental=True)
+    quietly(text_index.connect, path, store).close()
+    assert indexed_rows(path) == ({'secret-mafia': len(load_turns(columns=['turn'], store_dir=store)), 'ipd': 1},
+                                  store_state(store))
+
+    # A full re-ingest rewrites the parts, so every Secret Mafia row is replaced and the IPD row kept
+    quietly(ingest, synthetic.load_raw(raw[GAMES]), store_dir=store)
+    connection = quietly(text_index.connect, path, store)
+    assert text_index.count(connection, 'cooperate', source='ipd') == 1
+    connection.close()
+    assert indexed_rows(path) == ({'secret-mafia': len(load_turns(columns=['turn'], store_dir=store)), 'ipd': 1},
+                                  store_state(store))
+
+
+def test_matchups_of_large_games(tmp_path):
+    synthetic.write_raw(synthetic.parse_args(['--games', '30', '--players', '8', '--models', '12']),
+                        tmp_path / 'raw.arrow')
+    quietly(ingest, synthetic.load_raw(tmp_path / 'raw.arrow'), store_dir=tmp_path / 'store')
+    records = load_records(columns=['game_id', 'player_id', 'model_name', 'team', 'won'], store_dir=tmp_path / 'store')
+    assert records.groupby('game_id').size().max() > 6
+
+    expected = {name: {} for name in MATRICES}
+    for _, game in records.groupby('game_id'):
+        for a, b in permutations(game.itertuples(), 2):
+            counts = {'games': True, 'wins': a.won,
+                      'mafia_games': a.team == 'Mafia' and b.team == 'Village',
+                      'village_games': a.team == 'Village' and b.team == 'Mafia'}
+            counts['mafia_wins'] = counts['mafia_games'] and a.won
+            counts['village_wins'] = counts['village_games'] and a.won
+            for name, counted in counts.items():
+                if counted:
+                    pair = (a.model_name, b.model_name)
+                    expected[name][pair] = expected[name].get(pair, 0) + 1
+
+    matchups = Matchups.from_records(records)
+    for name in MATRICES:
+        matrix = matchups.matrices[name].tocoo()
+        actual = {(matchups.models[i], matchups.models[j]): count
+                  for i, j, count in zip(matrix.row, matrix.col, matrix.data) if count}
+        assert actual == expected[name], name
+
+
+def test_unconverged_fit_is_reported(store, monkeypatch, capsys):
+    records = load_records(columns=ratings.RECORD_COLUMNS, store_dir=store)
+    assert ratings.Ratings.from_records(records).converged
+
+    monkeypatch.setattr(ratings, 'minimize', partial(ratings.minimize, options={'maxiter': 1}))
+    rated = ratings.Ratings.from_records(records)
+    assert not rated.converged
+    assert np.isfinite(rated.ratings).all()
+    report_fit(rated)
+    assert 'did not converge' in capsys.readouterr().out
+
+
+def test_model_on_both_teams_cancels_out(store):
+    records = load_records(columns=ratings.RECORD_COLUMNS, store_dir=store)
+    game = records[records['game_id'] == records['game_id'].min()].copy()
+    mafia, village = game.index[game['team'] == 'Mafia'][0], game.index[game['team'] == 'Village'][0]
+    game.loc[village, 'model_name'] = game.loc[mafia, 'model_name']
+    models = pd.Index(sorted(game['model_name'].unique()), name='model_name')
+    X, _, _ = ratings.game_design(game, models)
+    assert X.shape[0] == 1
+    assert X[0, models.get_loc(game.loc[mafia, 'model_name'])] == 0
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Full-text index over Secret Mafia and IPD observations
+
+Finding an example of a phrase used to mean a linear scan of every observation
+string in Python. This builds one SQLite FTS5 index (data/text_index.sqlite)
+over the observation text, each row keyed back to its source,
+(game_id, player_id, timestamp), so a phrase lookup is an inverted-index query.
+The index records the store state it was built from; opening it after an
+ingest appends the new turns parts, or re-indexes the Secret Mafia rows if
+the parts it holds were rewritten.
+
+  python text_index.py build [--ipd [PATH]]
+  python text_index.py search '"attempted an invalid move"' [--limit N] [--source ipd]
+  python text_index.py count 'Reason NEAR invalid'
+
+Queries use FTS5 syntax: quote a phrase, combine terms with AND/OR/NOT, NEAR,
+or a prefix*. --phrase quotes the whole query for you.
+"""
+
+import argparse
+import json
+import sqlite3
+import time
+from itertools import chain
+from pathlib import Path
+
+import msgspec
+import pyarrow.parquet as pq
+
+from mafia_store import STORE_DIR, ensure_store, store_state
+from observations import decode_turns
+
+INDEX_PATH = STORE_DIR / 'text_index.sqlite'
+IPD_DATA_PATH = 'hf://datasets/bobbycxy/mgc2025-threeplayeripd/threeplayeripd.parquet'
+BATCH_SIZE = 10000
+
+SCHEMA = """
+CREATE VIRTUAL TABLE observations USING fts5(
+    observation,
+    source UNINDEXED,
+    game_id UNINDEXED,
+    player_id UNINDEXED,
+    timestamp UNINDEXED,
+    tokenize = 'unicode61'
+)
+"""
+META_SCHEMA = "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+INSERT = "INSERT INTO observations VALUES (?, ?, ?, ?, ?)"
+
+
+def turn_parts(store_dir=STORE_DIR):
+    """{part name: [size, mtime_ns]} of the turns table's parquet files."""
+    ensure_store(store_dir)
+    return {part.name: [part.stat().st_size, part.stat().st_mtime_ns]
+            for part in sorted((Path(store_dir) / 'turns').glob('part-*.parquet'))}
+
+
+def mafia_rows(store_dir=STORE_DIR, parts=None):
+    """(observation, source, game_id, player_id, timestamp) rows of the Secret Mafia turns table (or of some parts)."""
+    columns = ['game_id', 'player_id', 'timestamp', 'observation']
+    for name in (turn_parts(store_dir) if parts is None else parts):
+        part = Path(store_dir) / 'turns' / name
+        for batch in pq.ParquetFile(part, memory_map=True).iter_batches(batch_size=BATCH_SIZE, columns=columns):
+            data = batch.to_pydict()
+            yield from zip(data['observation'], ['secret-mafia'] * batch.num_rows,
+                           data['game_id'], data['player_id'], data['timestamp'])
+
+
+def ipd_rows(path=IPD_DATA_PATH):
+    """Rows of every observation entry in the IPD dataset; player_id is NULL if the file has none."""
+    import polars as pl
+
+    scan = pl.scan_parquet(path)
+    columns = ['game_id', 'observations'] + (['player_id'] if 'player_id' in scan.collect_schema() else [])
+    # Streamed batch by batch, so the file is never held in memory whole
+    batches = scan.select(columns).filter(pl.col('observations').is_not_null()).collect_batches(chunk_size=BATCH_SIZE)
+    for batch in batches:
+        player_ids = batch['player_id'] if 'player_id' in batch.columns else [None] * batch.height
+        for game_id, player_id, raw in zip(batch['game_id'], player_ids, batch['observations']):
+            try:
+                entries = decode_turns(raw)
+            except msgspec.DecodeError:
+                # Like detect_errors.py, index a value that is not JSON as one untimed observation
+                yield raw, 'ipd', game_id, player_id, None
+                continue
+            for timestamp, entry in entries.items():
+                yield entry.observation, 'ipd', game_id, player_id, timestamp
+
+
+def _insert(connection, rows):
+    batch = []
+    count = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            connection.executemany(INSERT, batch)
+            count += len(batch)
+            batch = []
+    connection.executemany(INSERT, batch)
+    return count + len(batch)
+
+
+def _stamp(connection, parts, store_dir=STORE_DIR):
+    """Record the store state and the turns parts the index now holds."""
+    connection.execute(META_SCHEMA)
+    connection.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                           [('store_state', store_state(store_dir)), ('parts', json.dumps(parts))])
+
+
+def build_index(rows, path=INDEX_PATH, store_dir=STORE_DIR):
+    """(Re)build the index from (observation, source, game_id, player_id, timestamp) rows.
+
+    `rows` are expected to hold every turn of the store, as `mafia_rows` yields them.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.unlink(missing_ok=True)
+
+    parts = turn_parts(store_dir)
+    connection = sqlite3.connect(path)
+    connection.execute(SCHEMA)
+    with connection:
+        count = _insert(connection, rows)
+        _stamp(connection, parts, store_dir)
+        connection.execute("INSERT INTO observations(observations) VALUES ('optimize')")
+    connection.close()
+    return count
+
+
+def refresh_index(path=INDEX_PATH, store_dir=STORE_DIR):
+    """Bring the Secret Mafia rows of an existing index up to date with the store.
+
+    Turns parts added by an incremental ingest are appended. If a part the
+    index holds has changed or gone (a full re-ingest), every Secret Mafia
+    row is replaced; IPD rows are kept either way. Returns the rows added.
+    """
+    connection = sqlite3.connect(path)
+    connection.execute(META_SCHEMA)
+    meta = dict(connection.execute("SELECT key, value FROM meta"))
+    if meta.get('store_state') == store_state(store_dir):
+        connection.close()
+        return 0
+
+    indexed = json.loads(meta.get('parts', '{}'))
+    parts = turn_parts(store_dir)
+    with connection:
+        if not indexed or any(parts.get(name) != stat for name, stat in indexed.items()):
+            print(f"The store was rebuilt, re-indexing its observations in {path}...")
+            connection.execute("DELETE FROM observations WHERE source = 'secret-mafia'")
+            indexed = {}
+        else:
+            print(f"Appending new turns to the text index at {path}...")
+        count = _insert(connection, mafia_rows(store_dir, [name for name in parts if name not in indexed]))
+        _stamp(connection, parts, store_dir)
+        connection.execute("INSERT INTO observations(observations) VALUES ('optimize')")
+    connection.close()
+    return count
+
+
+def connect(path=INDEX_PATH, store_dir=STORE_DIR):
+    if not Path(path).exists():
+        print(f"No text index found at {path}, building it from the store...")
+        build_index(mafia_rows(store_dir), path, store_dir)
+    else:
+        refresh_index(path, store_dir)
+    return sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+
+
+def _where(source):
+    return "observations MATCH ?" + (" AND source = ?" if source else "")
+
+
+def search(connection, query, limit=20, source=None, ranked=False):
+    """(source, game_id, player_id, timestamp, snippet) of matching observations.
+
+    Results come in store order; `ranked` orders them by bm25 instead, which
+    has to score every match before the first row is returned.
+    """
+    params = [query] + ([source] if source else []) + [limit]
+    order = " ORDER BY rank" if ranked else ""
+    return connection.execute(
+        "SELECT source, game_id, player_id, timestamp, snippet(observations, 0, '[', ']', '…', 16) "
+        f"FROM observations WHERE {_where(source)}{order} LIMIT ?", params).fetchall()
+
+
+def keys(connection, query, source=None):
+    """(source, game_id, player_id, timestamp) of every matching observation."""
+    params = [query] + ([source] if source else [])
+    return connection.execute(
+        f"SELECT source, game_id, player_id, timestamp FROM observations WHERE {_where(source)}", params).fetchall()
+
+
+def count(connection, query, source=None):
+    params = [query] + ([source] if source else [])
+    return connection.execute(f"SELECT count(*) FROM observations WHERE {_where(source)}", params).fetchone()[0]
+
+
+def phrase(text):
+    """Quote text as a single FTS5 phrase."""
+    return '"' + text.replace('"', '""') + '"'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('build', help='(re)build the index')
+    build.add_argument('--ipd', nargs='?', const=IPD_DATA_PATH, help='also index IPD observations from PATH')
+
+    for name in ('search', 'count'):
+        command = commands.add_parser(name, help=f'{name} observations matching an FTS5 query')
+        command.add_argument('query')
+        command.add_argument('--phrase', action='store_true', help='match the query as one exact phrase')
+        command.add_argument('--source', choices=['secret-mafia', 'ipd'])
+        if name == 'search':
+            command.add_argument('--limit', type=int, default=20)
+            command.add_argument('--rank', action='store_true', help='order results by bm25 relevance')
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        start = time.perf_counter()
+        rows = mafia_rows()
+        if args.ipd:
+            rows = chain(rows, ipd_rows(args.ipd))
+        indexed = build_index(rows)
+        size_mb = INDEX_PATH.stat().st_size / 1024 / 1024
+        print(f"Indexed {indexed:,} observations in {time.perf_counter() - start:.1f}s ({size_mb:.1f} MB at {INDEX_PATH})")
+        return
+
+    query = phrase(args.query) if args.phrase else args.query
+    connection = connect()
+    start = time.perf_counter()
+    if args.command == 'count':
+        result = count(connection, query, args.source)
+        print(f"{result:,} matching observations ({(time.perf_counter() - start) * 1000:.1f} ms)")
+        return
+
+    results = search(connection, query, args.limit, args.source, args.rank)
+    elapsed = time.perf_counter() - start
+    for source, game_id, player_id, timestamp, snippet in results:
+        player = '-' if player_id is None else player_id
+        print(f"{source:12s} game {game_id:<8} player {player:<3} {timestamp}")
+        print(f"    {' '.join(snippet.split())}")
+    print(f"\n{len(results)} results in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
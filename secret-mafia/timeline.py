@@ -0,0 +1,87 @@
+"""
+Cross-player game timelines
+
+Each player's record only holds that player's timestamped observations. A
+timeline merges all players of a game into one event stream ordered by the
+`time` column parsed at ingest (ties broken by player_id, then turn), so
+callers can see what every player did between two turns of any one player.
+Turns whose key could not be parsed (NaT) come last, ordered by the raw key.
+
+`game_timeline` k-way merges the per-player streams of a single game and
+caches the result until the store changes; `Timelines` builds every game in one batch with a single
+vectorized sort.
+"""
+
+import heapq
+import time
+from functools import lru_cache
+from pathlib import Path
+
+import pandas as pd
+
+from mafia_store import STORE_DIR, load_turns, store_state
+from record_index import FrameIndex
+
+TIMELINE_COLUMNS = ['game_id', 'time', 'timestamp', 'player_id', 'turn', 'role', 'observation', 'action']
+ORDER = ['time', 'player_id', 'turn']
+
+
+def sort_turns(turns, by=()):
+    """Sort turns by `by` then ORDER, with NaT times last in raw key order."""
+    # NaT compares False both ways, so untimed turns get the raw key as their own sort column
+    untimed = turns['timestamp'].where(turns['time'].isna(), '')
+    keys = list(by) + ['time', '_untimed', 'player_id', 'turn']
+    return turns.assign(_untimed=untimed).sort_values(keys, kind='stable', na_position='last').drop(columns='_untimed')
+
+
+def _event_key(event):
+    """The heap key matching `sort_turns`."""
+    if pd.isna(event['time']):
+        return True, event['timestamp'], event['player_id'], event['turn']
+    return False, event['time'], event['player_id'], event['turn']
+
+
+def merge_player_streams(turns):
+    """K-way merge of one game's per-player turn streams into a single ordered frame."""
+    streams = [
+        sort_turns(player_turns).to_dict('records')
+        for _, player_turns in turns.groupby('player_id', sort=True)
+    ]
+    events = heapq.merge(*streams, key=_event_key)
+    merged = pd.DataFrame(list(events), columns=turns.columns).astype(turns.dtypes.to_dict())
+    return merged[TIMELINE_COLUMNS].reset_index(drop=True)
+
+
+def game_timeline(game_id, store_dir=STORE_DIR):
+    """All players' turns of one game as a single ordered event stream."""
+    # Keyed on the store state, like the derived tables, so an ingest invalidates cached timelines
+    return _cached_timeline(game_id, Path(store_dir), store_state(store_dir))
+
+
+@lru_cache(maxsize=256)
+def _cached_timeline(game_id, store_dir, state):
+    turns = load_turns(columns=TIMELINE_COLUMNS, filters=[('game_id', '==', game_id)], store_dir=store_dir)
+    return merge_player_streams(turns)
+
+
+class Timelines:
+    """Merged event streams of every game, built in one batch from the turns table."""
+
+    def __init__(self, turns=None):
+        if turns is None:
+            turns = load_turns(columns=TIMELINE_COLUMNS)
+        self.events = sort_turns(turns, by=['game_id'])[TIMELINE_COLUMNS].reset_index(drop=True)
+        self.by_game = FrameIndex(self.events, 'game_id')
+
+    def __len__(self):
+        return len(self.by_game)
+
+    def game(self, game_id):
+        return self.by_game.rows(game_id).reset_index(drop=True)
+
+
+if __name__ == '__main__':
+    start = time.perf_counter()
+    timelines = Timelines()
+    elapsed = time.perf_counter() - start
+    print(f"Built {len(timelines):,} game timelines ({len(timelines.events):,} events) in {elapsed:.2f}s")
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Batched uncertainty for win rates
+
+`wilson_ci` computes Wilson score intervals for whole columns of wins and
+games at once. `bootstrap_ci` resamples games rather than records: the six
+records of a game share one outcome, so treating them as independent
+understates the spread. Each replicate draws the games with replacement; the
+draw counts form a replicates x games matrix R, and every group's games and
+wins in every replicate come from two sparse products with the group x game
+count matrices, so thousands of replicates for all models cost a few matrix
+multiplications. Groups can be any record columns, e.g. model_name, or
+model_name and role for role-stratified intervals.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from mafia_store import load_records
+
+Z_95 = 1.96
+BOOTSTRAP_REPLICATES = 2000
+BOOTSTRAP_BATCH = 250
+SEED = 0
+
+
+def wilson_ci(wins, n, z=Z_95):
+    """Wilson score interval (lower, upper) for arrays of wins and trials; NaN where n is 0."""
+    wins = np.asarray(wins, dtype=float)
+    n = np.asarray(n, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        phat = wins / n
+        denominator = 1 + z**2 / n
+        centre = (phat + z**2 / (2 * n)) / denominator
+        spread = z * np.sqrt((phat * (1 - phat) + z**2 / (4 * n)) / n) / denominator
+    return centre - spread, centre + spread
+
+
+def cluster_matrices(records, by='model_name'):
+    """Sparse (group x game) games and wins counts, and the group index."""
+    grouped = records.groupby(by, sort=True)
+    group_codes = grouped.ngroup().to_numpy()
+    groups = grouped.size().index
+    game_codes, game_ids = pd.factorize(records['game_id'])
+
+    keep = group_codes >= 0     # rows with a missing group key belong to no group
+    won = records['won'].fillna(False).to_numpy(dtype=float)[keep]
+    shape = (len(groups), len(game_ids))
+    games = sparse.csr_matrix((np.ones(keep.sum()), (group_codes[keep], game_codes[keep])), shape=shape)
+    wins = sparse.csr_matrix((won, (group_codes[keep], game_codes[keep])), shape=shape)
+    return games, wins, groups
+
+
+def resampling_matrix(rng, num_games, replicates):
+    """(num_games x replicates) draw counts, each column one bootstrap sample of the games."""
+    draws = rng.integers(0, num_games, size=(replicates, num_games))
+    draws += np.arange(replicates)[:, None] * num_games
+    return np.bincount(draws.ravel(), minlength=replicates * num_games).reshape(replicates, num_games).T
+
+
+def bootstrap_ci(records, by='model_name', replicates=BOOTSTRAP_REPLICATES, level=0.95, seed=SEED):
+    """Game-clustered percentile bootstrap intervals of the win rate of every group.
+
+    Returns boot_lower, boot_upper and boot_se per group; a group absent
+    from a replicate simply does not contribute to that replicate.
+    """
+    games, wins, groups = cluster_matrices(records, by)
+    rng = np.random.default_rng(seed)
+    rates = np.empty((len(groups), replicates))
+
+    for start in range(0, replicates, BOOTSTRAP_BATCH):
+        size = min(BOOTSTRAP_BATCH, replicates - start)
+        R = resampling_matrix(rng, games.shape[1], size)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rates[:, start:start + size] = (wins @ R) / (games @ R)
+
+    tail = (1 - level) / 2
+    lower, upper = np.nanquantile(rates, [tail, 1 - tail], axis=1)
+    return pd.DataFrame({'boot_lower': lower, 'boot_upper': upper, 'boot_se': np.nanstd(rates, axis=1)},
+                        index=groups)
+
+
+def with_intervals(perf, records=None, replicates=BOOTSTRAP_REPLICATES):
+    """Add Wilson (ci_lower, ci_upper) and game-clustered bootstrap columns to a per-model table.
+
+    `perf` is indexed by model_name with wins and total_games, as
+    ModelStats.to_frame() returns; the bootstrap resamples `records`.
+    """
+    if records is None:
+        records = load_records(columns=['game_id', 'model_name', 'won'], filters=[('num_observations', '>', 0)])
+    perf = perf.copy()
+    perf['ci_lower'], perf['ci_upper'] = wilson_ci(perf['wins'], perf['total_games'])
+    return perf.join(bootstrap_ci(records, 'model_name', replicates))
+
+
+if __name__ == '__main__':
+    records = load_records(columns=['game_id', 'model_name', 'role', 'won'], filters=[('num_observations', '>', 0)])
+    perf = records.groupby('model_name')['won'].agg(wins='sum', total_games='size')
+
+    start = time.perf_counter()
+    lower, upper = wilson_ci(perf['wins'], perf['total_games'])
+    print(f"Wilson intervals for {len(perf):,} models: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    start = time.perf_counter()
+    by_model = bootstrap_ci(records, 'model_name')
+    print(f"Game-clustered bootstrap, {BOOTSTRAP_REPLICATES:,} replicates of {records['game_id'].nunique():,} games "
+          f"for {len(by_model):,} models: {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    by_role = bootstrap_ci(records, ['model_name', 'role'])
+    print(f"Role-stratified bootstrap for {len(by_role):,} model/role groups: {time.perf_counter() - start:.2f}s")
+
+    width = pd.DataFrame({'wilson': upper - lower, 'bootstrap': by_model['boot_upper'] - by_model['boot_lower']})
+    print(f"\nMedian 95% interval width: Wilson {width['wilson'].median():.3f}, "
+          f"game-clustered bootstrap {width['bootstrap'].median():.3f}")